@@ -0,0 +1,51 @@
+"""Compare ``scraper.sequential_crawl`` against the concurrent ``Crawler`` on the stand-in.
+
+    python -m benchmarks.crawl --latency 0.1
+
+Each crawl runs ``--rounds`` times. The first round is reported separately as
+cold, since the concurrent crawler starts its parse processes on first use.
+"""
+import argparse
+import time
+
+from functools import partial
+
+from scraper import sequential_crawl
+from utils.crawler import Crawler
+
+from .stand_in import serve
+
+
+def sequential(base_url):
+    return sum(1 for _, cards in sequential_crawl(base_url) for _ in cards)
+
+
+def concurrent(crawler):
+    return sum(len(cards) for _, cards in crawler.crawl())
+
+
+def timed(run, rounds):
+    """``(cards, cold seconds, mean warm seconds)``"""
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        cards = run()
+        times.append(time.perf_counter() - start)
+    warm = times[1:] or times
+    return cards, times[0], sum(warm) / len(warm)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.1,
+                        help="Seconds the stand-in sleeps before each response, like a remote site")
+    parser.add_argument("--per-host-limit", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with serve(latency=args.latency) as base_url:
+        with Crawler(base_url=base_url, per_host_limit=args.per_host_limit) as crawler:
+            for name, run in [("sequential", partial(sequential, base_url)),
+                              ("concurrent", partial(concurrent, crawler))]:
+                cards, cold, warm = timed(run, args.rounds)
+                print(f"{name}: {cards} cards in {warm:.2f}s ({cold:.2f}s cold)")
@@ -0,0 +1,128 @@
+"""Compare embedding backends on throughput, memory and agreement with PyTorch.
+
+    python -m benchmarks.embeddings --backends huggingface onnx onnx:onnx/model_qint8_avx512.onnx
+
+Each backend runs in its own process so resident memory is its own: the
+ingest workload embeds fixture card texts in batches of every
+``--batch-sizes``, the query workload embeds queries one at a time. Vectors
+for a fixed text set are compared against the first backend, and a backend
+outside EMBEDDING_TOLERANCE is flagged. Backends that cannot load (missing
+package, no model download) are reported as skipped.
+"""
+import argparse
+import json
+import os
+import resource
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from utils.config import EMBEDDING_MODEL, EMBEDDING_TOLERANCE
+from utils.onnx_embeddings import SAMPLE_TEXTS
+
+from .parse import card_pages
+
+QUERIES = [
+    "lifetime free card with airport lounge access",
+    "cashback on Amazon and Flipkart shopping",
+    "travel card with international lounge access and golf",
+    "dining offers on Swiggy and Zomato under 1000 fee",
+    "movie tickets on BookMyShow",
+    "I fly Indigo a lot and want travel benefits up to 5k",
+]
+
+
+def memory_mb():
+    """Current and peak resident set size of this process"""
+    try:
+        with open("/proc/self/status") as f:
+            status = dict(line.split(":", 1) for line in f)
+        return {"rss_mb": int(status["VmRSS"].split()[0]) / 1024,
+                "peak_rss_mb": int(status["VmHWM"].split()[0]) / 1024}
+    except OSError:
+        # ru_maxrss is in KiB on Linux but bytes on macOS; only the peak is available
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"peak_rss_mb": peak / (1 << 20 if os.uname().sysname == "Darwin" else 1 << 10)}
+
+
+def load_backend(spec):
+    """``huggingface``, ``onnx`` or ``onnx:<file in the model repository>``"""
+    backend, _, onnx_file = spec.partition(":")
+    if backend == "huggingface":
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    if backend == "onnx":
+        from utils.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(**({"onnx_file": onnx_file} if onnx_file else {}))
+    raise ValueError(f"Unknown embedding backend {spec!r}")
+
+
+def set_batch_size(embeddings, batch_size):
+    if hasattr(embeddings, "encode_kwargs"):
+        embeddings.encode_kwargs["batch_size"] = batch_size
+    else:
+        embeddings.batch_size = batch_size
+
+
+def measure(spec, documents, batch_sizes, queries, reference_texts):
+    from utils.credit_card import CreditCard
+
+    pages = card_pages()
+    texts = [CreditCard.from_html(pages[i % len(pages)], url=f"/fixture-{i}/").to_text() for i in range(documents)]
+
+    start = time.perf_counter()
+    try:
+        embeddings = load_backend(spec)
+    except Exception as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+    report = {"load_seconds": time.perf_counter() - start, "after_load": memory_mb()}
+
+    report["ingest"] = {}
+    for batch_size in batch_sizes:
+        set_batch_size(embeddings, batch_size)
+        start = time.perf_counter()
+        embeddings.embed_documents(texts)
+        report["ingest"][str(batch_size)] = {"embeddings_per_second": len(texts) / (time.perf_counter() - start)}
+
+    start = time.perf_counter()
+    for i in range(queries):
+        embeddings.embed_query(QUERIES[i % len(QUERIES)])
+    report["query"] = {"embeddings_per_second": queries / (time.perf_counter() - start)}
+    report["after_workload"] = memory_mb()
+    report["vectors"] = embeddings.embed_documents(reference_texts)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["huggingface", "onnx"])
+    parser.add_argument("--documents", type=int, default=256)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    reference_texts = QUERIES + SAMPLE_TEXTS
+    report = {"model": EMBEDDING_MODEL, "documents": args.documents, "queries": args.queries, "backends": {}}
+    reference = None
+    for spec in args.backends:
+        # A fresh process per backend, so one's memory does not count towards the next
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            result = pool.submit(measure, spec, args.documents, args.batch_sizes,
+                                 args.queries, reference_texts).result()
+        vectors = result.pop("vectors", None)
+        if vectors is not None:
+            vectors = np.asarray(vectors, dtype=np.float64)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            if reference is None:
+                reference = (spec, vectors)
+            else:
+                similarity = float((vectors * reference[1]).sum(axis=1).min())
+                result["agreement"] = {"reference": reference[0],
+                                       "min_cosine_similarity": similarity,
+                                       "within_tolerance": similarity >= 1.0 - EMBEDDING_TOLERANCE}
+        report["backends"][spec] = result
+
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,96 @@
+"""Deterministic stand-ins for the Gemini chains and the embedding model.
+
+``install()`` swaps them in behind the lazy resource getters so the ingest
+and retrieval code paths run unchanged, without network access or API keys.
+"""
+import re
+import time
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.runnables import RunnableLambda
+
+from utils import card_features, card_filters
+from utils.card_features import CardFeatures, get_feature_extractor_chain
+from utils.card_filters import get_query_parser_chain
+from utils.config import EMBEDDING_SIZE
+from utils.fast_query_parser import FastQueryParser
+from utils.resources import get_embeddings
+
+FIELD_PATTERN = re.compile(r'^(?:\*\* )?(?P<key>[^:]+):(?: \*\*)?(?P<value>.*)$')
+AMOUNT_PATTERN = re.compile(r'\d[\d,]*')
+MERCHANTS = ("Amazon", "Flipkart", "Myntra", "Swiggy", "Zomato", "Big Basket",
+             "BookMyShow", "Indigo", "MakeMyTrip", "Uber")
+
+
+def _fields(product_information):
+    """``{key: value or [items]}`` from ``CreditCard.to_text`` output, full or compact"""
+    fields, key = {}, None
+    for line in product_information.splitlines():
+        if key and line.strip().startswith(("* ", "- ")):
+            fields[key].append(line.strip()[2:].strip())
+            continue
+        match = FIELD_PATTERN.match(line)
+        if match:
+            key = match["key"]
+            fields[key] = match["value"].strip() or []
+    return fields
+
+
+def _amount(value):
+    match = AMOUNT_PATTERN.search(value) if isinstance(value, str) else None
+    return int(match[0].replace(",", "")) if match else None
+
+
+def _text(value):
+    return value if isinstance(value, str) and value else None
+
+
+def fake_card_features(product_information):
+    fields = _fields(product_information)
+    return CardFeatures(
+        product_name=_text(fields.get("Product Name")),
+        joining_fee=_amount(fields.get("Joining Fee")),
+        renewal_fee=_amount(fields.get("Renewal Fee")),
+        best_suited_categories=fields.get("Best Suited For") or None,
+        rewards_type=fields.get("Reward Type") or None,
+        welcome_benefits=_text(fields.get("Welcome Benefits")),
+        movie_benefits=_text(fields.get("Movie & Dining")),
+        dining_benefits=_text(fields.get("Movie & Dining")),
+        travel_benefits=_text(fields.get("Travel")),
+        domestic_lounge_access_annual=_amount(fields.get("Domestic Lounge Access")),
+        domestic_lounge_access_quarterly=None,
+        international_lounge_access_annual=_amount(fields.get("International Lounge Access")),
+        international_lounge_access_quarterly=None,
+        golf_benefits=_text(fields.get("Golf")),
+        insurance_benefits=_text(fields.get("Insurance Benefits")),
+        waiver_amount=_amount(fields.get("Spend-Based Waiver")),
+        foreign_currency_markup=None,
+        merchant_offers=[{"merchant_brand": merchant, "offers": []}
+                         for merchant in MERCHANTS if merchant.lower() in product_information.lower()],
+    )
+
+
+def _fake_chain(build, key, latency, rate_limiter=None):
+    def invoke(inputs):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        if latency:
+            time.sleep(latency)
+        return build(inputs[key])
+    return RunnableLambda(invoke)
+
+
+def install(llm_latency=0.0, embedding_size=EMBEDDING_SIZE, rate_limited=False):
+    """Serve the fakes from the resource getters.
+
+    ``llm_latency`` simulates a model call; ``rate_limited`` makes the fake
+    chains wait on the real chains' rate limiters, as the models would.
+    """
+    query_parser = FastQueryParser(merchant_names=MERCHANTS, min_confidence=0.0)
+    get_feature_extractor_chain.override(
+        _fake_chain(fake_card_features, "product_information", llm_latency,
+                    card_features.rate_limiter if rate_limited else None))
+    get_query_parser_chain.override(
+        _fake_chain(lambda user_input: query_parser.parse(user_input)[0], "user_input", llm_latency,
+                    card_filters.rate_limiter if rate_limited else None))
+    get_embeddings.override(DeterministicFakeEmbedding(size=embedding_size))
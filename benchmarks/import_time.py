@@ -0,0 +1,46 @@
+"""Check that importing the entry points stays within the cold-start budget.
+
+    python -m benchmarks.import_time --budget 1.5
+
+Each module is imported in a fresh interpreter so nothing is already cached
+in ``sys.modules``; exits non-zero when any import exceeds the budget.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from pathlib import Path
+
+from utils.config import IMPORT_BUDGET_SECONDS
+
+ROOT = Path(__file__).resolve().parent.parent
+MODULES = ["query_parser", "scraper", "utils.query_graph", "utils.card_parser"]
+
+
+def import_seconds(module):
+    """Wall time of ``import module`` in a fresh interpreter, per ``-X importtime``"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    # Each line is "import time: self [us] | cumulative | name"; the top-level
+    # module is reported last with the cumulative time of everything it pulled in.
+    lines = [line for line in result.stderr.splitlines() if line.startswith("import time:")]
+    cumulative = int(lines[-1].split("|")[1])
+    return cumulative / 1e6
+
+
+def measure(modules=MODULES, repeat=3):
+    return {module: statistics.median(import_seconds(module) for _ in range(repeat))
+            for module in modules}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_SECONDS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    timings = measure(repeat=args.repeat)
+    print(json.dumps({"budget_seconds": args.budget, "import_seconds": timings}, indent=2))
+    sys.exit(0 if all(seconds <= args.budget for seconds in timings.values()) else 1)
@@ -0,0 +1,49 @@
+"""Measure CreditCard parse throughput on the saved fixture pages.
+
+    python -m benchmarks.parse --seconds 2
+"""
+import argparse
+import json
+import time
+
+from utils.credit_card import FAST_BACKEND, CreditCard
+
+from .stand_in import FIXTURES_DIR
+
+
+def card_pages():
+    pages = []
+    for path in sorted(FIXTURES_DIR.glob("*/index.html")):
+        html = path.read_bytes()
+        if b'card-main-title' in html:
+            pages.append(html)
+    return pages
+
+
+def pages_per_second(parse, pages, seconds):
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for html in pages:
+            parse(html)
+        count += len(pages)
+    return count / (time.perf_counter() - start)
+
+
+def measure(seconds=2.0):
+    pages = card_pages()
+    full = pages_per_second(lambda html: CreditCard.from_html(html, fast=False), pages, seconds)
+    fast = pages_per_second(lambda html: CreditCard.from_html(html), pages, seconds)
+    return {
+        "fixtures": len(pages),
+        "full_html.parser_pages_per_second": full,
+        f"sections_{FAST_BACKEND}_pages_per_second": fast,
+        "speedup": fast / full,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(json.dumps(measure(args.seconds), indent=2))
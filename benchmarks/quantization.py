@@ -0,0 +1,140 @@
+"""Trade recall@k against memory and latency for the vector quantization modes.
+
+    python -m benchmarks.quantization --cards 20000 --queries 200 --oversampling 1 2 4
+
+The catalog is clustered unit vectors, closer to real embeddings than
+isotropic noise, and each query is a perturbed catalog vector. Exact search
+without quantization is the ground truth. Every mode is run through the
+local index with each oversampling factor, and through Qdrant when it is
+reachable. ``index_bytes`` is what every search scans, i.e. what
+has to stay in RAM; the full-precision vectors are only read to rescore.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils.config import EMBEDDING_SIZE, QDRANT_URL
+from utils.local_store import LocalVectorStore
+from utils.quantization import (MODES, qdrant_quantization_config,
+                                qdrant_search_params)
+
+from .vector_store import percentiles
+
+BENCHMARK_COLLECTION = "credit_cards_quantization_benchmark"
+
+
+def clustered_catalog(cards, clusters=50, spread=0.6, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, EMBEDDING_SIZE))
+    vectors = centers[rng.integers(0, clusters, cards)] + spread * rng.normal(size=(cards, EMBEDDING_SIZE))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def query_set(vectors, queries, noise=0.3, seed=1):
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.integers(0, len(vectors), queries)]
+    picked = picked + noise * rng.normal(size=picked.shape) / np.sqrt(EMBEDDING_SIZE)
+    return (picked / np.linalg.norm(picked, axis=1, keepdims=True)).astype(np.float32)
+
+
+def recall(found, truth):
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def run_searches(search, queries, k):
+    found, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        found.append(search(query, k))
+        latencies.append(time.perf_counter() - start)
+    return found, percentiles(latencies)
+
+
+def local_index(vectors, path, mode, oversampling):
+    store = LocalVectorStore(DeterministicFakeEmbedding(size=EMBEDDING_SIZE), path,
+                             quantization=mode, oversampling=oversampling)
+    if not len(store):
+        ids = [str(i) for i in range(len(vectors))]
+        store.upsert_vectors(ids, vectors, ["" for _ in ids], [{} for _ in ids])
+    return store
+
+
+def local_report(vectors, queries, truth, k, oversamplings):
+    reports = {}
+    with tempfile.TemporaryDirectory() as root:
+        for mode in MODES:
+            for oversampling in (oversamplings if mode != "none" else [1.0]):
+                store = local_index(vectors, os.path.join(root, mode), mode, oversampling)
+                found, latency = run_searches(
+                    lambda query, k: [doc.metadata["_id"]
+                                      for doc, _ in store.search_by_vectors([query], [None], k=k)[0]],
+                    queries, k)
+                index = store.codes if store.codes is not None else store.vectors
+                name = mode if mode == "none" else f"{mode}@{oversampling:g}x"
+                reports[name] = {f"recall@{k}": recall(found, truth),
+                                 "index_bytes": int(index.nbytes),
+                                 "vector_bytes": int(store.vectors.nbytes),
+                                 **latency}
+    return reports
+
+
+def qdrant_report(vectors, queries, truth, k, oversamplings, url):
+    from qdrant_client import QdrantClient, models
+
+    client = QdrantClient(url=url, timeout=30)
+    reports = {}
+    for mode in MODES:
+        if client.collection_exists(BENCHMARK_COLLECTION):
+            client.delete_collection(BENCHMARK_COLLECTION)
+        client.create_collection(
+            collection_name=BENCHMARK_COLLECTION,
+            vectors_config=models.VectorParams(size=EMBEDDING_SIZE, distance=models.Distance.COSINE),
+            quantization_config=qdrant_quantization_config(mode),
+        )
+        client.upload_points(BENCHMARK_COLLECTION, points=[
+            models.PointStruct(id=i, vector=vector.tolist()) for i, vector in enumerate(vectors)
+        ], wait=True)
+
+        for oversampling in (oversamplings if mode != "none" else [1.0]):
+            params = qdrant_search_params(mode, oversampling=oversampling)
+
+            def search(query, k):
+                return [str(point.id) for point in client.query_points(
+                    BENCHMARK_COLLECTION, query=query.tolist(), limit=k, search_params=params).points]
+
+            found, latency = run_searches(search, queries, k)
+            name = mode if mode == "none" else f"{mode}@{oversampling:g}x"
+            reports[name] = {f"recall@{k}": recall(found, truth), **latency}
+    client.delete_collection(BENCHMARK_COLLECTION)
+    return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--oversampling", type=float, nargs="+", default=[1.0, 2.0, 4.0, 8.0])
+    parser.add_argument("--qdrant-url", default=QDRANT_URL)
+    args = parser.parse_args()
+
+    vectors = clustered_catalog(args.cards)
+    queries = query_set(vectors, args.queries)
+    # Exact top-k by brute force is the ground truth
+    truth = [[str(i) for i in np.argsort(-(vectors @ query))[:args.k]] for query in queries]
+
+    report = {"cards": args.cards, "queries": args.queries, "k": args.k,
+              "local": local_report(vectors, queries, truth, args.k, args.oversampling)}
+    try:
+        report["qdrant"] = qdrant_report(vectors, queries, truth, args.k, args.oversampling, args.qdrant_url)
+    except Exception as e:
+        report["qdrant"] = {"skipped": str(e)}
+
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,121 @@
+"""Load-test the recommendation service with stand-in LLMs and vector store.
+
+    python -m benchmarks.service_load --requests 2000 --clients 64 --llm-latency 0.5
+
+The fixture cards are indexed into a throwaway local index with the fake
+feature extractor, the service runs in-process on an ephemeral port, and
+concurrent clients replay a mix of queries with many duplicates. Queries the
+rule-based parser cannot handle go to the fake LLM, which waits on the real
+query parser rate limiter, so the LLM budget and load shedding are exercised.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+# Must be set before anything under utils/ reads its config
+if __name__ == "__main__":
+    os.environ["VECTOR_BACKEND"] = "local"
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="cardinsider-load-")
+    atexit.register(shutil.rmtree, os.environ["CACHE_DIR"], ignore_errors=True)
+    for name in ("EMBEDDING_CACHE_DIR", "LOCAL_INDEX_DIR", "MERCHANT_INDEX_PATH"):
+        os.environ.pop(name, None)
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from collections import Counter
+
+import aiohttp
+
+from aiohttp import web
+
+from service import COALESCED, RecommendationService, create_app
+from utils.card_payload import build_payload
+from utils.config import CACHE_DIR
+from utils.credit_card import CreditCard
+from utils.local_store import LocalVectorStore
+from utils.resources import get_embeddings, get_vector_store
+
+from . import fakes
+from .parse import card_pages
+from .vector_store import percentiles
+
+# Some of these fall below the rule-based parser's confidence threshold and need the LLM
+QUERIES = [
+    "lifetime free card with airport lounge access",
+    "cashback on Amazon and Flipkart shopping",
+    "travel card with international lounge access and golf",
+    "dining offers on Swiggy and Zomato under 1000 fee",
+    "movie tickets on BookMyShow",
+    "a card that suits someone who commutes a lot and likes weekend getaways",
+    "something premium to impress clients at business dinners",
+]
+
+
+def index_fixtures():
+    store = LocalVectorStore(get_embeddings(), os.path.join(CACHE_DIR, "index"))
+    cards = [CreditCard.from_html(html, url=f"/fixture-{i}/") for i, html in enumerate(card_pages())]
+    texts = [card.to_text() for card in cards]
+    store.add_texts(texts, metadatas=[build_payload(fakes.fake_card_features(text), card.url)
+                                      for card, text in zip(cards, texts)])
+    get_vector_store.override(store)
+
+
+async def client(session, url, queries, results):
+    while queries:
+        query = queries.pop()
+        start = time.perf_counter()
+        async with session.post(url, json={"query": query}) as response:
+            await response.read()
+            results.append((response.status, time.perf_counter() - start))
+
+
+async def load(requests, clients, max_concurrency, max_pending):
+    service = RecommendationService(max_concurrency=max_concurrency, max_pending=max_pending)
+    runner = web.AppRunner(create_app(service))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}/recommend"
+
+    rng = random.Random(0)
+    queries = [rng.choice(QUERIES) for _ in range(requests)]
+    results = []
+    start = time.perf_counter()
+    try:
+        connector = aiohttp.TCPConnector(limit=clients)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await asyncio.gather(*(client(session, url, queries, results) for _ in range(clients)))
+    finally:
+        elapsed = time.perf_counter() - start
+        await runner.cleanup()
+
+    statuses = Counter(status for status, _ in results)
+    return {
+        "requests": len(results),
+        "clients": clients,
+        "requests_per_second": len(results) / elapsed,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "coalesced": sum(series["value"] for series in COALESCED.snapshot()),
+        "ok_latency": percentiles([latency for status, latency in results if status == 200] or [0.0, 0.0]),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--llm-latency", type=float, default=0.5,
+                        help="Seconds each fake LLM call sleeps for")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--max-pending", type=int, default=64)
+    args = parser.parse_args()
+
+    fakes.install(llm_latency=args.llm_latency, rate_limited=True)
+    index_fixtures()
+    report = asyncio.run(load(args.requests, args.clients, args.max_concurrency, args.max_pending))
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,53 @@
+"""Local HTTP stand-in for cardinsider.com serving the saved fixture pages.
+
+    python -m benchmarks.stand_in --port 8000 --latency 0.2
+    CARDINSIDER_BASE_URL=http://127.0.0.1:8000 python scraper.py
+"""
+import argparse
+import threading
+import time
+
+from contextlib import contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "cardinsider"
+
+
+class StandInHandler(SimpleHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve(port=0, latency=0.0, directory=FIXTURES_DIR):
+    """Serve ``directory`` in a background thread and yield its base URL"""
+    handler = type("Handler", (StandInHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), partial(handler, directory=str(directory)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds to sleep before answering each request")
+    args = parser.parse_args()
+
+    with serve(args.port, args.latency) as base_url:
+        print(f"Serving {FIXTURES_DIR} at {base_url}")
+        threading.Event().wait()
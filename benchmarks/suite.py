@@ -0,0 +1,186 @@
+"""Run the offline ingest and retrieval benchmarks and report them as JSON.
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --baseline bench.json --tolerance 0.2
+
+Everything runs against the saved fixture pages served by the stand-in, the
+fakes in ``benchmarks/fakes.py`` and a throwaway local vector index, so
+results only move when the code does. With ``--baseline`` the run is compared
+metric by metric against an earlier report and exits non-zero on regressions.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+# Must be set before anything under utils/ reads its config. Parse workers
+# re-import this module as __mp_main__ and inherit the environment instead.
+if __name__ == "__main__":
+    os.environ["VECTOR_BACKEND"] = "local"
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="cardinsider-bench-")
+    atexit.register(shutil.rmtree, os.environ["CACHE_DIR"], ignore_errors=True)
+    for name in ("FEATURE_CACHE_PATH", "EMBEDDING_CACHE_DIR", "CHECKPOINT_PATH",
+                 "SNAPSHOT_DIR", "LOCAL_INDEX_DIR"):
+        os.environ.pop(name, None)
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from query_parser import retrieve
+from utils import query_graph
+from utils.batch_extractor import BatchExtractor
+from utils.checkpoint import CheckpointLog
+from utils.config import CACHE_DIR, EMBEDDING_SIZE
+from utils.crawler import Crawler
+from utils.credit_card import CreditCard
+from utils.intent_cache import IntentCache
+from utils.local_store import LocalVectorStore
+from utils.pipeline import IngestPipeline
+from utils.resources import get_embeddings, get_vector_store
+from utils.utils import compact_fields, json_to_text
+
+from . import fakes
+from .parse import card_pages, measure as measure_parse
+from .stand_in import serve
+from .vector_store import percentiles
+
+QUERIES = [
+    "lifetime free card with airport lounge access",
+    "I spend mostly on Swiggy and Zomato, want dining offers under 1000 fee",
+    "travel card with international lounge access and golf",
+    "cashback on Amazon and Flipkart shopping",
+    "movie tickets on BookMyShow",
+    "card for groceries from Big Basket with no annual fee",
+    "I fly Indigo a lot and want travel benefits up to 5k",
+    "best card for online spends",
+]
+
+
+def measure_json_to_text(seconds):
+    records = [CreditCard.from_html(html).to_dict() for html in card_pages()]
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for record in records:
+            json_to_text(record)
+        count += len(records)
+    return {"records_per_second": count / (time.perf_counter() - start)}
+
+
+def measure_compact_text(seconds):
+    records = [CreditCard.from_html(html).to_dict() for html in card_pages()]
+    reports = [compact_fields(record)[1] for record in records]
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for record in records:
+            compact_fields(record)
+        count += len(records)
+    return {"records_per_second": count / (time.perf_counter() - start),
+            "tokens_before": sum(report["tokens_before"] for report in reports) / len(reports),
+            "tokens_after": sum(report["tokens_after"] for report in reports) / len(reports)}
+
+
+def measure_ingest(base_url, rounds, llm_latency):
+    """Run the streaming pipeline ``rounds`` times over the stand-in catalog"""
+    cards, elapsed = 0, 0.0
+    with Crawler(base_url=base_url) as crawler:
+        for round_ in range(rounds):
+            extractor = BatchExtractor()
+            pipeline = IngestPipeline(crawler, extractor,
+                                      CheckpointLog(os.path.join(CACHE_DIR, f"checkpoint-{round_}.log")))
+            start = time.perf_counter()
+            if not pipeline.run():
+                raise RuntimeError("Ingest aborted")
+            elapsed += time.perf_counter() - start
+            cards += pipeline.counts["upserted"]
+    return {"rounds": rounds, "cards": cards, "llm_latency_s": llm_latency,
+            "cards_per_minute": 60 * cards / elapsed}
+
+
+def measure_retrieve(queries, iterations):
+    # A fresh intent cache keeps warm-cache hits from masking the parse path
+    query_graph.INTENT_CACHE = IntentCache(embed=lambda text: get_embeddings().embed_query(text))
+    latencies = []
+    for _ in range(iterations):
+        for query in queries:
+            start = time.perf_counter()
+            retrieve(query)
+            latencies.append(time.perf_counter() - start)
+    return {"queries": len(latencies), "indexed_cards": len(get_vector_store()), **percentiles(latencies)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(seconds=2.0, rounds=5, iterations=20, llm_latency=0.0):
+    fakes.install(llm_latency=llm_latency)
+    get_vector_store.override(LocalVectorStore(get_embeddings(), os.path.join(CACHE_DIR, "index"),
+                                               dim=EMBEDDING_SIZE))
+
+    report = {"revision": git_revision(), "python": platform.python_version()}
+    report["parse"] = measure_parse(seconds)
+    report["json_to_text"] = measure_json_to_text(seconds)
+    report["compact_text"] = measure_compact_text(seconds)
+    with serve() as base_url:
+        report["ingest"] = measure_ingest(base_url, rounds, llm_latency)
+    report["retrieve"] = measure_retrieve(QUERIES, iterations)
+    return report
+
+
+def _metrics(report, prefix=""):
+    for key, value in report.items():
+        if isinstance(value, dict):
+            yield from _metrics(value, f"{prefix}{key}.")
+        elif key.endswith(("_ms", "_per_second", "_per_minute")):
+            yield f"{prefix}{key}", value
+
+
+def regressions(report, baseline, tolerance):
+    """``(metric, baseline, current)`` for every metric that got worse by more than ``tolerance``"""
+    previous = dict(_metrics(baseline))
+    worse = []
+    for metric, value in _metrics(report):
+        if metric not in previous or not previous[metric]:
+            continue
+        change = value / previous[metric] - 1
+        if metric.endswith("_ms"):
+            change = -change
+        if change < -tolerance:
+            worse.append((metric, previous[metric], value))
+    return worse
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0,
+                        help="Time budget of each throughput measurement")
+    parser.add_argument("--rounds", type=int, default=5, help="Ingest runs over the fixture catalog")
+    parser.add_argument("--iterations", type=int, default=20, help="Passes over the sample queries")
+    parser.add_argument("--llm-latency", type=float, default=0.0,
+                        help="Seconds each fake LLM call sleeps for")
+    parser.add_argument("--output", help="Also write the report to this file")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative slowdown per metric before failing")
+    args = parser.parse_args()
+
+    report = run(args.seconds, args.rounds, args.iterations, args.llm_latency)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            worse = regressions(report, json.load(f), args.tolerance)
+        for metric, before, after in worse:
+            print(f"Regression: {metric} {before:.3f} -> {after:.3f}", file=sys.stderr)
+        sys.exit(1 if worse else 0)
@@ -0,0 +1,107 @@
+"""Compare filtered top-k search latency of the local index against Qdrant.
+
+    python -m benchmarks.vector_store --cards 3000 --queries 500
+
+Both backends get the same random unit vectors and payloads, and are queried
+by vector so embedding time is left out. Qdrant is skipped when unreachable.
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils.config import EMBEDDING_SIZE, QDRANT_URL
+from utils.local_store import LocalVectorStore
+
+BENCHMARK_COLLECTION = "credit_cards_benchmark"
+
+
+def synthetic_catalog(cards, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(cards, EMBEDDING_SIZE)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    metadatas = [{"renewal_fee": int(rng.choice([0, 499, 999, 2500, 10000])),
+                  "has_travel_benefits": bool(rng.random() < 0.4),
+                  "has_golf_benefits": bool(rng.random() < 0.1)}
+                 for _ in range(cards)]
+    return vectors, metadatas
+
+
+def query_filter(rng):
+    return {"must": [{"key": "metadata.renewal_fee", "range": {"lte": int(rng.choice([0, 999, 5000]))}}],
+            "should": [{"key": "metadata.has_travel_benefits", "match": {"value": True}},
+                       {"key": "metadata.has_golf_benefits", "match": {"value": True}}]}
+
+
+def percentiles(latencies):
+    cuts = statistics.quantiles(latencies, n=100)
+    return {"p50_ms": 1000 * cuts[49], "p95_ms": 1000 * cuts[94], "p99_ms": 1000 * cuts[98]}
+
+
+def time_searches(search, queries, filters, k):
+    latencies = []
+    for query, filter in zip(queries, filters):
+        start = time.perf_counter()
+        search(query, filter, k)
+        latencies.append(time.perf_counter() - start)
+    return percentiles(latencies)
+
+
+def local_backend(vectors, metadatas, path):
+    store = LocalVectorStore(DeterministicFakeEmbedding(size=EMBEDDING_SIZE), path)
+    ids = [str(i) for i in range(len(vectors))]
+    store.upsert_vectors(ids, vectors, ["" for _ in ids], metadatas)
+    return lambda query, filter, k: store.similarity_search_by_vector(query, k=k, filter=filter)
+
+
+def qdrant_backend(vectors, metadatas, url):
+    from qdrant_client import QdrantClient, models
+
+    client = QdrantClient(url=url, timeout=5)
+    if client.collection_exists(BENCHMARK_COLLECTION):
+        client.delete_collection(BENCHMARK_COLLECTION)
+    client.create_collection(
+        collection_name=BENCHMARK_COLLECTION,
+        vectors_config=models.VectorParams(size=EMBEDDING_SIZE, distance=models.Distance.COSINE),
+    )
+    client.upload_points(BENCHMARK_COLLECTION, points=[
+        models.PointStruct(id=i, vector=vector.tolist(), payload={"page_content": "", "metadata": metadata})
+        for i, (vector, metadata) in enumerate(zip(vectors, metadatas))
+    ], wait=True)
+
+    def search(query, filter, k):
+        return client.query_points(BENCHMARK_COLLECTION, query=query.tolist(),
+                                   query_filter=models.Filter(**filter), limit=k).points
+
+    return search
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--qdrant-url", default=QDRANT_URL)
+    args = parser.parse_args()
+
+    vectors, metadatas = synthetic_catalog(args.cards)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, args.cards, args.queries)]
+    filters = [query_filter(rng) for _ in range(args.queries)]
+
+    report = {"cards": args.cards, "queries": args.queries, "k": args.k}
+    with tempfile.TemporaryDirectory() as path:
+        report["local"] = time_searches(local_backend(vectors, metadatas, path), queries, filters, args.k)
+
+    try:
+        report["qdrant"] = time_searches(qdrant_backend(vectors, metadatas, args.qdrant_url),
+                                         queries, filters, args.k)
+    except Exception as e:
+        report["qdrant"] = {"skipped": str(e)}
+
+    print(json.dumps(report, indent=2))
@@ -1,7 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from dotenv import load_dotenv
 
+from utils.config import METRICS_PORT, RETRIEVE_MAX_CONCURRENCY
 from utils.logging_config import LOGGER
-from utils.query_graph import FEATURE_EXTRACTOR_GRAPH
+from utils.metrics import start_metrics_server
+from utils.query_graph import FEATURE_EXTRACTOR_GRAPH, parse_query_intent, search_many
 
 load_dotenv()
 
@@ -15,6 +19,19 @@ def retrieve(user_input):
     return docs
 
 
+def retrieve_many(queries, k=10, max_concurrency=RETRIEVE_MAX_CONCURRENCY):
+    """Retrieve documents for every query, returned in input order"""
+    queries = list(queries)
+    if not queries:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        query_intents = list(pool.map(parse_query_intent, queries))
+
+    LOGGER.info("Searching vectorDB for %d queries...", len(queries))
+    return search_many(queries, query_intents, k=k)
+
+
 if __name__ == "__main__":
     import pprint
 
@@ -22,4 +39,6 @@ if __name__ == "__main__":
         "Indigo and buying groceries from Big basket. I am looking for a lifetime free card which provides " \
         "Airport Lounge Access benefits."
 
+    if METRICS_PORT:
+        start_metrics_server()
     pprint.pprint(retrieve(query))
\ No newline at end of file
@@ -1,84 +1,145 @@
 import requests
 
-from uuid import uuid4
-
-from time import sleep
 from bs4 import BeautifulSoup
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
 
+from utils.checkpoint import CheckpointLog
+from utils.config import (BASE_URL, CRAWL_MODE, CRAWL_OFFLINE, METRICS_PORT,
+                          SNAPSHOT_DIR)
+from utils.crawler import ISSUER_INDEX_PATH, Crawler, rebase
 from utils.credit_card import CreditCard
-from utils.card_parser import FEATURE_EXTRACTOR_GRAPH
+from utils.batch_extractor import BatchExtractor
+from utils.card_parser import get_feature_cache
+from utils.card_payload import build_payload
+from utils.catalog_manifest import CatalogManifest
+from utils.catalog_snapshot import CatalogSnapshot
+from utils.chunking import chunk_documents, point_id
+from utils.embedding_cache import CachedEmbeddings
 from utils.logging_config import LOGGER
+from utils.merchant_index import MerchantIndex
+from utils.metrics import EMBED_SECONDS, start_metrics_server
+from utils.pipeline import IngestPipeline
+from utils.resources import (ensure_collection, flush_points, get_embeddings,
+                             upsert_points)
+from utils.snapshot_store import SnapshotStore
 
 
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-client = QdrantClient(url="http://localhost:6333")
-
-LOGGER.info("Checking if collection exists..")
-if client.collection_exists(collection_name="credit_cards"):
-    LOGGER.info("Collection already exists.")
-
-else:
-    LOGGER.info("Collection does not exist. Creating collection...")
-    client.create_collection(
-        collection_name="credit_cards",
-        vectors_config=VectorParams(size=384, distance=Distance.COSINE),
-    )
-
-vector_store = QdrantVectorStore(
-    client=client,
-    collection_name="credit_cards",
-    embedding=embeddings,
-)
-
-response = requests.get('https://cardinsider.com/card-issuer/')
-soup = BeautifulSoup(response.content, 'html.parser')
-issuers = soup.find_all('div', class_='item-new')
-credit_cards = []
-iter_num = 1
-
-for issuer in issuers:
-    a_ = issuer.find('a')
-    bank_name = a_.text
-    bank_url = f"https://cardinsider.com{a_['href']}"
-    
-    r = requests.get(bank_url)
-    sp = BeautifulSoup(r.content, 'html.parser')
-    cards = sp.find_all('div', class_='single_credit_card_box')
-    docs = []
+def _fetch_card(card_url, base_url):
+    # Cards keep their listed URL as identity, as in the concurrent crawl
+    url = rebase(card_url, base_url)
+    LOGGER.info("Fetching Data for URL: %s", url)
+    return CreditCard.from_html(requests.get(url).content, card_url)
+
+
+def sequential_crawl(base_url=BASE_URL):
+    """Yield issuers and their cards, fetching one page at a time"""
+    response = requests.get(rebase(ISSUER_INDEX_PATH, base_url))
+    soup = BeautifulSoup(response.content, 'html.parser')
+    issuers = soup.find_all('div', class_='item-new')
+
+    for issuer in issuers:
+        a_ = issuer.find('a')
+        bank_name = a_.text
+        bank_url = rebase(a_['href'], base_url)
+
+        r = requests.get(bank_url)
+        sp = BeautifulSoup(r.content, 'html.parser')
+        cards = sp.find_all('div', class_='single_credit_card_box')
+        links = [(a_.text, a_["href"]) for a_ in (card.find('a', class_='title_list_link') for card in cards)]
 
-    for i, card in enumerate(cards, iter_num):
-        a_ = card.find('a', class_='title_list_link')
-        card_name = a_.text
-        card_url = a_["href"]
-        
-        LOGGER.info("Iteration %d: Extracting Data for '%s'", i, card_name)
-        cc = CreditCard(card_url)
-        card_summary = cc.to_text()
-
-        try:
-            initial_state = {"product_information": card_summary}
-            final_state = FEATURE_EXTRACTOR_GRAPH.invoke(initial_state)
-
-            card_features = final_state["card_features"].model_dump()
-            document = Document(page_content=card_summary, metadata=card_features)
-            
-            docs.append(document)
-        
-        except Exception as e:
-            LOGGER.error("Error: '%s'. Skipping...", e)
-            LOGGER.info("Failed extracting Data for '%s'. Skipping...", card_name)
-            sleep(10)
-
-        iter_num += 1
+        yield bank_name, ((card_name, _fetch_card(card_url, base_url)) for card_name, card_url in links)
 
+
+def index_documents(extracted, merchant_index=None):
+    """Embed and upsert extracted cards, returning their payloads"""
+    docs = []
+    for (card_name, card_url), card_summary, card_features in extracted:
+        docs.append(Document(page_content=card_summary, metadata=build_payload(card_features, card_url)))
+        if merchant_index is not None:
+            merchant_index.add(card_url, docs[-1].metadata)
+
+    payloads = [doc.metadata for doc in docs]
+    docs = chunk_documents(docs)
     LOGGER.info("Indexing %d record(s) to vectorDB...", len(docs))
-    uuids = [str(uuid4()) for _ in range(len(docs))]
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
-    all_splits = text_splitter.split_documents(docs)
-    vector_store.add_documents(documents=docs, ids=uuids)
+    if docs:
+        with EMBED_SECONDS.time(operation="documents"):
+            vectors = get_embeddings().embed_documents([doc.page_content for doc in docs])
+        upsert_points(ids=[point_id(doc.metadata) for doc in docs],
+                      vectors=vectors,
+                      texts=[doc.page_content for doc in docs],
+                      metadatas=[doc.metadata for doc in docs])
+    return payloads
+
+
+def index_catalog(crawl, merchant_index=None, snapshot=None):
+    feature_cache = get_feature_cache()
+    extractor = BatchExtractor(cache=feature_cache)
+    payloads = []
+    iter_num = 1
+
+    for bank_name, cards in crawl:
+        LOGGER.info("Processing cards issued by '%s'", bank_name)
+        batch = []
+
+        for i, (card_name, cc) in enumerate(cards, iter_num):
+            LOGGER.info("Iteration %d: Extracting Data for '%s'", i, card_name)
+            batch.append(((card_name, cc.url), cc.to_text()))
+            iter_num += 1
+
+        payloads += index_documents(extractor.extract(batch), merchant_index)
+
+    payloads += index_documents(extractor.drain(), merchant_index)
+    LOGGER.info("Vector store holds %d point(s)", flush_points())
+    if snapshot is not None:
+        snapshot.update(payloads)
+    if merchant_index is not None:
+        merchant_index.save()
+    for (card_name, _), _, error in extractor.failed:
+        LOGGER.info("Failed extracting Data for '%s': %s", card_name, error)
+
+    stats = feature_cache.stats()
+    LOGGER.info("Feature cache: %d hit(s), %d miss(es) (%.0f%% hit rate)",
+                stats["hits"], stats["misses"], 100 * stats["hit_rate"])
+
+    embeddings = get_embeddings()
+    if isinstance(embeddings, CachedEmbeddings):
+        stats = embeddings.stats()
+        LOGGER.info("Embedding cache: %d hit(s), %d miss(es) (%.0f%% hit rate)",
+                    stats["hits"], stats["misses"], 100 * stats["hit_rate"])
+
+
+def main():
+    if METRICS_PORT:
+        start_metrics_server()
+    get_feature_cache().invalidate()
+    ensure_collection()
+    snapshots = SnapshotStore() if SNAPSHOT_DIR else None
+    merchant_index = MerchantIndex()
+
+    if CRAWL_MODE == "stream" or CRAWL_OFFLINE:
+        with Crawler(snapshots=snapshots) as crawler:
+            extractor = BatchExtractor(cache=get_feature_cache())
+            manifest = CatalogManifest()
+            if len(manifest) and not flush_points():
+                # The collection was recreated or emptied: nothing the manifest lists is indexed
+                LOGGER.info("Vector store is empty, re-indexing all %d card(s) in the manifest", len(manifest))
+                manifest.clear()
+            crawled = IngestPipeline(crawler, extractor, CheckpointLog(), merchant_index=merchant_index,
+                                     manifest=manifest, snapshot=CatalogSnapshot()).run()
+    elif CRAWL_MODE == "concurrent":
+        with Crawler(snapshots=snapshots) as crawler:
+            index_catalog(crawler.crawl(), merchant_index, CatalogSnapshot())
+        crawled = True
+    else:
+        # The sequential crawl does not go through the snapshot archive
+        index_catalog(sequential_crawl(), merchant_index, CatalogSnapshot())
+        crawled = False
+
+    if snapshots is not None:
+        if crawled:
+            snapshots.prune()
+        LOGGER.info("Snapshots: %s", snapshots.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Asynchronous HTTP recommendation service around the query graph.
+
+    python service.py
+    curl -s localhost:8080/recommend -d '{"query": "lifetime free card with lounge access"}'
+"""
+import asyncio
+import time
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+from utils.config import (SERVICE_HOST, SERVICE_MAX_CONCURRENCY,
+                          SERVICE_MAX_PENDING, SERVICE_PORT,
+                          SERVICE_WAIT_FOR_LLM)
+from utils.intent_cache import normalize_query
+from utils.logging_config import LOGGER
+from utils.metrics import REGISTRY
+from utils.query_graph import FEATURE_EXTRACTOR_GRAPH, LLMBudgetExhausted
+from utils.resources import warmup
+
+load_dotenv()
+
+REQUEST_SECONDS = REGISTRY.histogram("service_request_seconds", "Recommendation request latency")
+REQUESTS = REGISTRY.counter("service_requests_total", "Recommendation requests by outcome")
+COALESCED = REGISTRY.counter("service_coalesced_total", "Requests that joined an identical in-flight query")
+
+LLM_RETRY_AFTER_SECONDS = 5
+
+
+class Overloaded(Exception):
+    pass
+
+
+class RecommendationService:
+    """Runs the query graph for HTTP requests.
+
+    At most ``max_concurrency`` graph runs execute at once and at most
+    ``max_pending`` more distinct queries may wait for a slot; beyond that
+    requests are rejected straight away. Identical queries that arrive while
+    one is running or waiting share its result, so they cost one LLM call and
+    one search.
+    """
+
+    def __init__(self, graph=FEATURE_EXTRACTOR_GRAPH,
+                 max_concurrency=SERVICE_MAX_CONCURRENCY,
+                 max_pending=SERVICE_MAX_PENDING,
+                 wait_for_llm=SERVICE_WAIT_FOR_LLM):
+        self.graph = graph
+        self.max_pending = max_pending
+        self.wait_for_llm = wait_for_llm
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._in_flight = {}
+
+
+    @property
+    def running(self):
+        """Distinct queries holding a slot"""
+        return min(len(self._in_flight), self.max_concurrency)
+
+
+    @property
+    def waiting(self):
+        """Distinct queries waiting for a slot"""
+        return len(self._in_flight) - self.running
+
+
+    async def _run(self, query):
+        async with self._slots:
+            state = await self.graph.ainvoke({"user_input": query, "wait_for_llm": self.wait_for_llm})
+        return state["context"]
+
+
+    async def recommend(self, query):
+        key = normalize_query(query)
+        task = self._in_flight.get(key)
+        if task is not None:
+            COALESCED.inc()
+        else:
+            # Every slot taken and max_pending queries already queued behind them
+            if self.waiting >= self.max_pending:
+                raise Overloaded(f"{self.waiting} queries already waiting")
+            task = asyncio.ensure_future(self._run(query))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded so one client disconnecting does not cancel the shared run
+        return await asyncio.shield(task)
+
+
+def _error(status, message, **headers):
+    return web.json_response({"error": message}, status=status, headers=headers)
+
+
+async def recommend(request):
+    start = time.perf_counter()
+    try:
+        body = await request.json()
+        query = body["query"].strip()
+        if not query:
+            raise ValueError
+    except Exception:
+        REQUESTS.inc(outcome="bad_request")
+        return _error(400, 'Expected a JSON body like {"query": "..."}')
+
+    try:
+        docs = await request.app["service"].recommend(query)
+    except Overloaded as e:
+        REQUESTS.inc(outcome="overloaded")
+        return _error(503, f"Service overloaded: {e}", **{"Retry-After": "1"})
+    except LLMBudgetExhausted as e:
+        REQUESTS.inc(outcome="llm_budget")
+        return _error(503, f"{e}; retry later", **{"Retry-After": str(LLM_RETRY_AFTER_SECONDS)})
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - start)
+
+    REQUESTS.inc(outcome="ok")
+    return web.json_response({
+        "query": query,
+        "cards": [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs],
+    })
+
+
+async def metrics(request):
+    return web.Response(text=REGISTRY.prometheus(), content_type="text/plain")
+
+
+async def metrics_json(request):
+    return web.json_response(REGISTRY.snapshot())
+
+
+async def healthz(request):
+    service = request.app["service"]
+    return web.json_response({"status": "ok", "running": service.running, "waiting": service.waiting})
+
+
+def create_app(service=None):
+    app = web.Application()
+    app["service"] = service or RecommendationService()
+    app.router.add_post("/recommend", recommend)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/metrics.json", metrics_json)
+    app.router.add_get("/healthz", healthz)
+    return app
+
+
+if __name__ == "__main__":
+    warmup()
+    LOGGER.info("Serving recommendations at http://%s:%d/recommend", SERVICE_HOST, SERVICE_PORT)
+    web.run_app(create_app(), host=SERVICE_HOST, port=SERVICE_PORT, print=None)
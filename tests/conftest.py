@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from benchmarks.fakes import fake_card_features
+from benchmarks.parse import card_pages
+from utils.card_payload import build_payload
+from utils.credit_card import CreditCard
+
+
+@pytest.fixture(scope="session")
+def cards():
+    """``(CreditCard, payload)`` for every fixture card page"""
+    result = []
+    for i, html in enumerate(card_pages()):
+        card = CreditCard.from_html(html, url=f"https://cardinsider.com/fixture-{i}/")
+        result.append((card, build_payload(fake_card_features(card.to_text()), card.url)))
+    return result
+
+
+@pytest.fixture
+def unit_vectors():
+    def make(count, dim, seed=0):
+        vectors = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return make
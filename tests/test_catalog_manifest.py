@@ -0,0 +1,50 @@
+from utils.catalog_manifest import CatalogManifest, fingerprint, index_settings
+
+
+def test_status_tracks_fingerprints(tmp_path):
+    manifest = CatalogManifest(str(tmp_path / "manifest.sqlite"))
+    assert manifest.status("/a/", fingerprint("one")) == "new"
+
+    manifest.record({"/a/": fingerprint("one")}, at=1.0)
+    assert manifest.status("/a/", fingerprint("one")) == "unchanged"
+    assert manifest.status("/a/", fingerprint("two")) == "changed"
+
+
+def test_unlisted_cards_go_stale(tmp_path):
+    manifest = CatalogManifest(str(tmp_path / "manifest.sqlite"))
+    manifest.record({"/a/": fingerprint("a"), "/b/": fingerprint("b"), "/c/": fingerprint("c")}, at=1.0)
+
+    manifest.seen(["/a/", "/c/"], at=2.0)
+    assert manifest.stale(before=2.0) == ["/b/"]
+
+    manifest.remove(manifest.stale(before=2.0))
+    assert len(manifest) == 2
+    assert manifest.status("/b/", fingerprint("b")) == "new"
+
+
+def test_seen_never_moves_back(tmp_path):
+    manifest = CatalogManifest(str(tmp_path / "manifest.sqlite"))
+    manifest.record({"/a/": fingerprint("a")}, at=5.0)
+    manifest.seen(["/a/"], at=3.0)
+    assert manifest.stale(before=4.0) == []
+
+
+def test_clear(tmp_path):
+    manifest = CatalogManifest(str(tmp_path / "manifest.sqlite"))
+    manifest.record({"/a/": fingerprint("a")}, at=1.0)
+    manifest.clear()
+    assert len(manifest) == 0
+
+
+def test_fingerprint_covers_index_settings():
+    assert fingerprint("text") == fingerprint("text", index_settings())
+    assert fingerprint("text", "other settings") != fingerprint("text")
+
+
+def test_index_settings_include_extractor_and_store():
+    from utils.config import COLLECTION_NAME, LOCAL_INDEX_DIR, VECTOR_BACKEND
+    from utils.feature_cache import extractor_version
+
+    settings = index_settings()
+    assert extractor_version() in settings
+    assert (LOCAL_INDEX_DIR if VECTOR_BACKEND == "local" else COLLECTION_NAME) in settings
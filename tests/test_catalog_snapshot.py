@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils.catalog_snapshot import CatalogSnapshot
+from utils.local_store import LocalVectorStore
+from utils.pipeline import IngestPipeline
+from utils.resources import get_vector_store
+
+DIM = 8
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = LocalVectorStore(DeterministicFakeEmbedding(size=DIM), str(tmp_path / "index"), dim=DIM)
+    monkeypatch.setattr("utils.resources.VECTOR_BACKEND", "local")
+    get_vector_store.override(store)
+    yield store
+    get_vector_store.reset()
+
+
+def _index(store, payloads):
+    # Two chunks per card, as in chunk mode
+    records = [(f"{payload['card_id']}-{i}", {**payload, "chunk_index": i}) for payload in payloads for i in range(2)]
+    store.upsert_vectors([id_ for id_, _ in records], np.ones((len(records), DIM)),
+                         ["" for _ in records], [metadata for _, metadata in records])
+
+
+def _pipeline(snapshot, upserted=(), removed=()):
+    pipeline = IngestPipeline(crawler=None, extractor=None, checkpoint=None, snapshot=snapshot)
+    pipeline._payloads = {payload["card_url"]: payload for payload in upserted}
+    pipeline._removed = list(removed)
+    return pipeline
+
+
+def _card_ids(snapshot):
+    cards, _ = snapshot.tables()
+    return sorted(cards["card_id"].to_pylist())
+
+
+def test_update_replaces_and_removes_cards(tmp_path, cards):
+    payloads = [payload for _, payload in cards]
+    snapshot = CatalogSnapshot(str(tmp_path / "catalog"))
+    snapshot.update(payloads)
+    snapshot.update(payloads[:1], removed=[payloads[1]["card_id"]])
+
+    assert _card_ids(snapshot) == sorted(payload["card_id"] for payload in payloads[:1] + payloads[2:])
+    _, offers = snapshot.tables()
+    assert set(offers["card_id"].to_pylist()) <= set(_card_ids(snapshot))
+
+
+def test_missing_snapshot_is_built_from_the_index(tmp_path, store, cards):
+    payloads = [payload for _, payload in cards]
+    _index(store, payloads)
+    snapshot = CatalogSnapshot(str(tmp_path / "catalog"))
+
+    # Only the first card changed this run; the rest were skipped before extraction
+    _pipeline(snapshot, upserted=payloads[:1])._update_snapshot()
+    assert _card_ids(snapshot) == sorted(payload["card_id"] for payload in payloads)
+
+
+def test_existing_snapshot_is_only_updated(tmp_path, store, cards):
+    payloads = [payload for _, payload in cards]
+    snapshot = CatalogSnapshot(str(tmp_path / "catalog"))
+    snapshot.update(payloads[:1])
+    _index(store, payloads)
+
+    _pipeline(snapshot, upserted=payloads[1:2])._update_snapshot()
+    assert _card_ids(snapshot) == sorted(payload["card_id"] for payload in payloads[:2])
@@ -0,0 +1,83 @@
+import pytest
+
+from utils.utils import KEYS, compact_fields, count_tokens, json_to_text
+
+
+def _card(**fields):
+    card = {key: None for key in KEYS}
+    card.update({"Product Name": "Test Card", "Joining Fee": 500, "Renewal Fee": 500})
+    card.update(fields)
+    return card
+
+
+def test_drops_empty_fields_and_collapses_whitespace():
+    text, _ = compact_fields(_card(**{"Golf": "  Two   rounds\n a month ", "Travel": "", "Best Suited For": ["Shopping ", " "]}))
+    assert "Golf: Two rounds a month" in text
+    assert "Travel" not in text
+    assert "Best Suited For:\n- Shopping" in text
+
+
+def test_keeps_equal_short_values():
+    text, _ = compact_fields(_card())
+    assert "Joining Fee: 500" in text and "Renewal Fee: 500" in text
+
+
+def test_repeat_is_dropped_from_trimmable_field_only():
+    lounge = "8 complimentary domestic lounge visits per year"
+    text, _ = compact_fields(_card(**{"Domestic Lounge Access": lounge,
+                                      "Product Details": [lounge, "5% cashback on Amazon"]}))
+    assert f"Domestic Lounge Access: {lounge}" in text
+    assert text.count(lounge) == 1
+
+
+def test_total_budget_cuts_trimmable_fields_first():
+    lounge = "8 complimentary domestic lounge visits per year (2 per quarter)."
+    card = _card(**{"Domestic Lounge Access": lounge,
+                    "Product Description": "A long description of the card. " * 20,
+                    "Product Details": [lounge] + [f"Benefit number {i} with some detail" for i in range(30)],
+                    "Interest Rates": "3.6% per month"})
+    text, report = compact_fields(card, total_budget=60)
+    assert lounge in text
+    assert "Product Description" in report["truncated"]
+    assert report["tokens_after"] < report["tokens_before"]
+
+
+def test_field_budget():
+    text, report = compact_fields(_card(**{"Golf": "word " * 100}), field_budget=10)
+    assert report["truncated"] == ["Golf"]
+    golf = next(line for line in text.splitlines() if line.startswith("Golf:"))
+    assert count_tokens(golf.removeprefix("Golf: ")) <= 11
+
+
+def test_missing_keys():
+    card = _card()
+    del card["Golf"]
+    assert "** Golf: ** " in json_to_text(card)
+    text, report = compact_fields(card)
+    assert report["tokens_before"] > report["tokens_after"] > 0
+
+
+def test_fixture_cards_keep_extracted_features(cards):
+    from benchmarks.fakes import fake_card_features
+
+    for card, _ in cards:
+        assert fake_card_features(card.to_text(compact=True)) == fake_card_features(card.to_text(compact=False))
+
+
+def test_trimming_keeps_offer_bullets():
+    details = [f"General card benefit number {i} described at some length" for i in range(20)]
+    details += ["5% cashback on Amazon", "10X reward points at Swiggy"]
+    text, report = compact_fields(_card(**{"Product Details": details}), total_budget=40)
+    assert "Product Details" in report["truncated"]
+    assert "5% cashback on Amazon" in text and "10X reward points at Swiggy" in text
+    assert "number 19" not in text
+
+
+@pytest.mark.parametrize("total_budget", [150, 300])
+def test_trimmed_fixture_cards_keep_merchant_offers(cards, total_budget):
+    from benchmarks.fakes import fake_card_features
+
+    for card, _ in cards:
+        text, _ = compact_fields(card.to_dict(), total_budget=total_budget)
+        assert (fake_card_features(text).merchant_offers
+                == fake_card_features(card.to_text(compact=False)).merchant_offers)
@@ -0,0 +1,25 @@
+import sqlite3
+
+import pytest
+
+from benchmarks.parse import card_pages
+from utils.crawler import Crawler
+from utils.snapshot_store import SnapshotStore
+
+URL = "https://cardinsider.com/fixture-0/"
+
+
+def _locked(*args):
+    raise sqlite3.OperationalError("database is locked")
+
+
+@pytest.mark.parametrize("method", ["get_parsed", "put_parsed"])
+def test_parse_archive_failures_do_not_fail_the_card(tmp_path, monkeypatch, method):
+    snapshots = SnapshotStore(str(tmp_path))
+    snapshots.put("http://localhost/fixture-0/", card_pages()[0])
+    monkeypatch.setattr(snapshots, method, _locked)
+
+    with Crawler(base_url="http://localhost", parse_workers=1, snapshots=snapshots, offline=True) as crawler:
+        assert crawler.fetch_card(URL).result(timeout=60).url == URL
+        with pytest.raises(Exception):
+            crawler.fetch_card("https://cardinsider.com/missing/").result(timeout=60)
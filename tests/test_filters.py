@@ -0,0 +1,82 @@
+"""The query filters mean the same on the local index and on Qdrant"""
+import pytest
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from qdrant_client import QdrantClient, models
+
+from utils.card_filters import CardFilters
+from utils.local_store import LocalVectorStore
+from utils.query_graph import _metadata_filter
+
+DIM = 16
+COLLECTION = "filters"
+NO_CONSTRAINTS = {field: None for field in CardFilters.model_fields}
+
+INTENTS = {
+    "unconstrained": {},
+    "lifetime_free": {"acceptable_fees": 0},
+    "fee_cap": {"acceptable_fees": 1000},
+    "golf": {"has_golf_benefits": True},
+    "lounges": {"has_domestic_lounge_access": True, "has_international_lounge_access": True},
+    "category": {"top_spend_categories": ["Travel"]},
+    "merchant": {"top_merchant_brands": ["Amazon"]},
+    "merchant_alias": {"top_merchant_brands": ["Big Basket"]},
+    "unknown_merchant": {"top_merchant_brands": ["Nowhere Mart"]},
+    "combined": {"acceptable_fees": 3000, "has_dining_benefits": True, "top_merchant_brands": ["Swiggy"]},
+}
+
+
+@pytest.fixture(scope="module")
+def backends(cards, tmp_path_factory):
+    import numpy as np
+
+    vectors = np.eye(len(cards), DIM, dtype=np.float32) + 0.1
+    payloads = [payload for _, payload in cards]
+
+    local = LocalVectorStore(DeterministicFakeEmbedding(size=DIM), str(tmp_path_factory.mktemp("index")), dim=DIM)
+    local.upsert_vectors([str(i) for i in range(len(cards))], vectors, ["" for _ in cards], payloads)
+
+    client = QdrantClient(":memory:")
+    client.create_collection(COLLECTION, vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE))
+    client.upsert(COLLECTION, points=[
+        models.PointStruct(id=i, vector=vector.tolist(), payload={"page_content": "", "metadata": payload})
+        for i, (vector, payload) in enumerate(zip(vectors, payloads))
+    ])
+    return local, client, vectors.mean(axis=0)
+
+
+def _local_ids(local, query, metadata_filter):
+    return {doc.metadata["_id"] for doc, _ in local.search_by_vectors([query], [metadata_filter], k=100)[0]}
+
+
+def _qdrant_ids(client, query, metadata_filter):
+    points = client.query_points(COLLECTION, query=query.tolist(), limit=100,
+                                 query_filter=models.Filter(**metadata_filter)).points
+    return {str(point.id) for point in points}
+
+
+@pytest.mark.parametrize("name", INTENTS)
+def test_backends_agree(backends, name):
+    local, client, query = backends
+    metadata_filter = _metadata_filter(CardFilters(**{**NO_CONSTRAINTS, **INTENTS[name]}).model_dump())
+    assert _local_ids(local, query, metadata_filter) == _qdrant_ids(client, query, metadata_filter)
+
+
+def test_unconstrained_query_matches_every_card(backends, cards):
+    local, client, query = backends
+    metadata_filter = _metadata_filter(CardFilters(**NO_CONSTRAINTS).model_dump())
+    assert metadata_filter == {}
+    assert len(_qdrant_ids(client, query, metadata_filter)) == len(cards)
+
+
+def test_fee_cap_filters_cards(backends, cards):
+    local, client, query = backends
+    metadata_filter = _metadata_filter(CardFilters(**{**NO_CONSTRAINTS, "acceptable_fees": 1000}).model_dump())
+    expected = {str(i) for i, (_, payload) in enumerate(cards) if payload["renewal_fee"] <= 1000}
+    assert 0 < len(expected) < len(cards)
+    assert _qdrant_ids(client, query, metadata_filter) == expected
+
+
+def test_empty_should_matches_nothing_on_both(backends):
+    local, client, query = backends
+    assert _local_ids(local, query, {"should": []}) == _qdrant_ids(client, query, {"should": []}) == set()
@@ -0,0 +1,59 @@
+import types
+
+import pytest
+
+from utils.intent_cache import IntentCache
+from utils.metrics import INTENT_CACHE_EVENTS
+
+VECTORS = {
+    "lounge card": [1.0, 0.0, 0.0],
+    "airport lounge card": [0.95, 0.31, 0.0],
+    "lounge access card": [0.9, 0.0, 0.44],
+    "fuel card": [0.0, 0.0, 1.0],
+}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=0.0)
+    monkeypatch.setattr("utils.intent_cache.time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def _events(tier):
+    return {item["labels"]["event"]: item["value"] for item in INTENT_CACHE_EVENTS.snapshot()
+            if item["labels"]["tier"] == tier}
+
+
+def test_exact_tier_counts_hits_misses_and_evictions(clock):
+    before = _events("exact")
+    cache = IntentCache(max_size=2, ttl=60)
+    cache.put("Lounge card", "lounge")
+    cache.put("fuel card", "fuel")
+    cache.put("golf card", "golf")
+
+    assert cache.get("lounge  CARD!") is None
+    assert cache.get("golf card") == "golf"
+    clock.now = 61
+    assert cache.get("fuel card") is None
+
+    stats = cache.stats()["exact"]
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["expirations"]) == (1, 2, 1, 1)
+    after = _events("exact")
+    assert {event: after[event] - before.get(event, 0) for event in after} == {
+        "hits": 1, "misses": 2, "evictions": 1, "expirations": 1}
+
+
+def test_semantic_tier_skips_expired_neighbours(clock):
+    cache = IntentCache(ttl=60, embed=VECTORS.__getitem__, max_distance=0.2)
+    cache.put("lounge card", "closest")
+    clock.now = 30
+    cache.put("lounge access card", "next closest")
+
+    assert cache.get("airport lounge card") == "closest"
+    clock.now = 70
+    assert cache.get("airport lounge card") == "next closest"
+    assert cache.stats()["semantic"]["expirations"] == 1
+    clock.now = 100
+    assert cache.get("airport lounge card") is None
+    assert cache.get("fuel card") is None
@@ -0,0 +1,58 @@
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils.local_store import LocalVectorStore
+
+DIM = 8
+
+
+def _store(path, quantization="none"):
+    return LocalVectorStore(DeterministicFakeEmbedding(size=DIM), str(path), dim=DIM, quantization=quantization)
+
+
+def _upsert(store, vectors, start=0):
+    ids = [str(start + i) for i in range(len(vectors))]
+    store.upsert_vectors(ids, vectors, ["" for _ in ids], [{"n": start + i} for i in range(len(ids))])
+    return ids
+
+
+def test_other_instances_see_writes(tmp_path, unit_vectors):
+    writer, reader = _store(tmp_path), _store(tmp_path)
+    _upsert(writer, unit_vectors(3, DIM))
+    assert reader.ids == ["0", "1", "2"]
+
+    writer.delete(["1"])
+    assert reader.ids == ["0", "2"]
+    assert _store(tmp_path).ids == ["0", "2"]
+
+
+def test_search_finds_each_vector(tmp_path, unit_vectors):
+    store = _store(tmp_path)
+    vectors = unit_vectors(5, DIM)
+    _upsert(store, vectors)
+    for i, vector in enumerate(vectors):
+        [(document, score)] = store.similarity_search_with_score_by_vector(vector, k=1)
+        assert document.metadata["n"] == i and score > 0.99
+
+
+def test_compaction_keeps_live_points(tmp_path, unit_vectors):
+    store = _store(tmp_path, quantization="int8")
+    vectors = unit_vectors(40, DIM)
+    for start in range(0, 40, 4):
+        _upsert(store, vectors[start:start + 4], start)
+        store.delete([str(start)])
+
+    reopened = _store(tmp_path, quantization="int8")
+    assert len(reopened) == 30
+    assert len(reopened.vectors) < 2 * 40
+    [(document, _)] = reopened.similarity_search_with_score_by_vector(vectors[39], k=1)
+    assert document.metadata["n"] == 39
+
+
+def test_delete_after_quantization_change(tmp_path, unit_vectors):
+    _upsert(_store(tmp_path, quantization="none"), unit_vectors(3, DIM))
+
+    store = _store(tmp_path, quantization="int8")
+    store.delete(["1"])
+    assert store.ids == ["0", "2"]
+    assert len(store.codes) == len(store.vectors) == 2
+    assert _store(tmp_path, quantization="int8").ids == ["0", "2"]
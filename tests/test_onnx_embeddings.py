@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils.config import EMBEDDING_MODEL, EMBEDDING_TOLERANCE
+from utils.onnx_embeddings import SAMPLE_TEXTS, check_embeddings, compare_embeddings
+
+
+class Drifted(DeterministicFakeEmbedding):
+    """The fake embedding with every vector nudged by ``noise``"""
+
+    noise: float = 0.0
+
+    def embed_documents(self, texts):
+        vectors = np.asarray(super().embed_documents(texts))
+        return (vectors + self.noise * np.random.default_rng(0).normal(size=vectors.shape)).tolist()
+
+
+def test_check_embeddings_rejects_drift():
+    reference = DeterministicFakeEmbedding(size=64)
+    assert check_embeddings(Drifted(size=64, noise=0.001), reference) > 1 - EMBEDDING_TOLERANCE
+    with pytest.raises(ValueError):
+        check_embeddings(Drifted(size=64, noise=0.5), reference)
+
+
+def test_onnx_matches_pytorch():
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("sentence_transformers")
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    from utils.onnx_embeddings import OnnxEmbeddings
+
+    try:
+        candidate, reference = OnnxEmbeddings(), HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    except OSError as e:
+        pytest.skip(f"{EMBEDDING_MODEL} is not available: {e}")
+    assert compare_embeddings(candidate, reference, SAMPLE_TEXTS) >= 1 - EMBEDDING_TOLERANCE
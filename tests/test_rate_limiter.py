@@ -0,0 +1,139 @@
+import asyncio
+import threading
+
+from utils.rate_limiter import BULK, INTERACTIVE, PrepaidToken, SharedRateLimiter
+
+
+class Clock:
+    """A clock that moves when told to, or by ``step`` every time it is read"""
+
+    def __init__(self, step=0.0):
+        self.now = 1000.0
+        self.step = step
+        self.readers = set()
+
+    def __call__(self):
+        self.readers.add(threading.get_ident())
+        self.now += self.step
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def _limiter(tmp_path, name, clock, priority=BULK, reserve=0):
+    return SharedRateLimiter(name, priority=priority, path=str(tmp_path / "limits.sqlite"),
+                             requests_per_second=20, max_bucket_size=2,
+                             check_every_n_seconds=0.001, reserve=reserve, clock=clock)
+
+
+def _fill(limiter, clock):
+    # The bucket starts empty; a full refill takes max_bucket_size / requests_per_second
+    assert limiter.try_acquire() is None
+    clock.advance(1)
+
+
+def test_bucket_is_shared_between_instances(tmp_path):
+    clock = Clock()
+    first, second = _limiter(tmp_path, "first", clock), _limiter(tmp_path, "second", clock)
+    _fill(first, clock)
+    assert first.try_acquire() and second.try_acquire()
+    assert first.try_acquire() is None and second.try_acquire() is None
+
+    clock.advance(1.5 / 20)
+    assert second.try_acquire()
+
+
+def test_prepaid_token_pays_for_next_acquire(tmp_path):
+    clock = Clock()
+    limiter = _limiter(tmp_path, "parser", clock, priority=INTERACTIVE)
+    _fill(limiter, clock)
+    token = limiter.try_acquire()
+    assert isinstance(token, PrepaidToken)
+    limiter.try_acquire()
+
+    with limiter.prepaid(token):
+        assert limiter.acquire(blocking=False)
+        assert not limiter.acquire(blocking=False)
+    assert token.spent
+
+
+def test_prepaid_token_only_pays_for_its_own_limiter(tmp_path):
+    clock = Clock()
+    limiter, other = _limiter(tmp_path, "parser", clock), _limiter(tmp_path, "other", clock)
+    _fill(limiter, clock)
+    token = limiter.try_acquire()
+    limiter.try_acquire()
+
+    with limiter.prepaid(token):
+        assert not other.acquire(blocking=False)
+    assert not token.spent
+
+
+def test_bulk_yields_to_waiting_interactive_caller(tmp_path):
+    clock = Clock()
+    interactive = _limiter(tmp_path, "query", clock, priority=INTERACTIVE)
+    bulk = _limiter(tmp_path, "extract", clock)
+    assert not interactive._consume("waiter")
+    clock.advance(1)
+
+    assert bulk.try_acquire() is None
+    interactive._release_waiter("waiter")
+    assert bulk.try_acquire()
+
+
+def test_stale_waiters_stop_blocking_bulk(tmp_path):
+    clock = Clock()
+    interactive = _limiter(tmp_path, "query", clock, priority=INTERACTIVE)
+    bulk = _limiter(tmp_path, "extract", clock)
+    assert not interactive._consume("gone")
+    clock.advance(60)
+    assert bulk.try_acquire()
+
+
+def test_bulk_leaves_reserve_for_interactive(tmp_path):
+    clock = Clock()
+    interactive = _limiter(tmp_path, "query", clock, priority=INTERACTIVE)
+    bulk = _limiter(tmp_path, "extract", clock, reserve=1)
+    _fill(interactive, clock)
+
+    assert bulk.try_acquire()
+    assert bulk.try_acquire() is None
+    assert interactive.try_acquire()
+
+
+def test_blocking_acquire_waits_for_refill(tmp_path):
+    clock = Clock(step=0.01)
+    limiter = _limiter(tmp_path, "extract", clock)
+    start = clock.now
+    assert limiter.acquire()
+    assert clock.now - start >= 1 / 20
+
+
+def test_aacquire_spends_token_only_in_its_task(tmp_path):
+    clock = Clock()
+    limiter = _limiter(tmp_path, "parser", clock, priority=INTERACTIVE)
+    _fill(limiter, clock)
+    token = limiter.try_acquire()
+    limiter.try_acquire()
+
+    async def with_token():
+        with limiter.prepaid(token):
+            return await limiter.aacquire(blocking=False)
+
+    async def main():
+        return await asyncio.gather(with_token(), limiter.aacquire(blocking=False))
+
+    assert asyncio.run(main()) == [True, False]
+
+
+def test_aacquire_reads_bucket_off_the_event_loop(tmp_path):
+    clock = Clock(step=0.01)
+    limiter = _limiter(tmp_path, "extract", clock)
+
+    async def main():
+        assert await limiter.aacquire()
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    assert clock.readers and loop_thread not in clock.readers
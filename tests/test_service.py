@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from service import Overloaded, RecommendationService
+
+
+class Graph:
+    """Stands in for the query graph; every run blocks until ``release`` is set"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.runs = 0
+
+    async def ainvoke(self, state):
+        self.runs += 1
+        await self.release.wait()
+        return {"context": [state["user_input"]]}
+
+
+def test_max_pending_counts_only_waiting_queries():
+    async def main():
+        graph = Graph()
+        service = RecommendationService(graph=graph, max_concurrency=2, max_pending=1)
+        tasks = [asyncio.ensure_future(service.recommend(query)) for query in ("a", "b", "c")]
+        await asyncio.sleep(0)
+        assert (service.running, service.waiting) == (2, 1)
+
+        with pytest.raises(Overloaded):
+            await service.recommend("d")
+        coalesced = asyncio.ensure_future(service.recommend("C!"))
+
+        graph.release.set()
+        results = await asyncio.gather(*tasks, coalesced)
+        await asyncio.sleep(0)
+        return results, graph.runs, (service.running, service.waiting)
+
+    results, runs, counts = asyncio.run(main())
+    assert results == [["a"], ["b"], ["c"], ["c"]]
+    assert runs == 3
+    assert counts == (0, 0)
@@ -0,0 +1,147 @@
+import time
+
+from collections import deque
+
+from langchain_core.runnables import RunnableLambda
+
+from .card_features import get_feature_extractor_chain
+from .config import (EXTRACT_BACKOFF_BASE, EXTRACT_BACKOFF_MAX,
+                     EXTRACT_MAX_ATTEMPTS, EXTRACT_MAX_IN_FLIGHT)
+from .logging_config import LOGGER
+from .metrics import EXTRACT_SECONDS
+
+QUOTA_MARKERS = ("429", "resource exhausted", "resourceexhausted", "quota", "rate limit")
+
+
+def is_quota_error(error):
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in QUOTA_MARKERS)
+
+
+class BatchExtractor:
+    """Extract ``CardFeatures`` for many product summaries at once.
+
+    Each call to ``extract`` runs the feature extractor chain's ``batch`` with at
+    most ``concurrency`` requests in flight; the chain's rate limiter still
+    paces the individual calls. Quota errors halve the concurrency and back
+    off exponentially before the affected cards are retried, and a clean
+    round grows the concurrency again up to ``max_in_flight``. Other failures
+    go on ``retry_queue`` and are picked up by the next ``extract`` call or
+    by ``drain``; cards that run out of attempts end up in ``failed``.
+    """
+
+    def __init__(self,
+                 chain=None,
+                 cache=None,
+                 max_in_flight=EXTRACT_MAX_IN_FLIGHT,
+                 max_attempts=EXTRACT_MAX_ATTEMPTS,
+                 backoff_base=EXTRACT_BACKOFF_BASE,
+                 backoff_max=EXTRACT_BACKOFF_MAX):
+        self.chain = chain
+        self.cache = cache
+        self.max_in_flight = max_in_flight
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.concurrency = max_in_flight
+        self.retry_queue = deque()
+        self.failed = []
+        self._backoff = 0.0
+
+
+    def _record_failure(self, item, text, attempts, error):
+        if attempts >= self.max_attempts:
+            LOGGER.error("Error: '%s'. Giving up on '%s' after %d attempt(s).", error, item, attempts)
+            self.failed.append((item, text, error))
+        else:
+            LOGGER.warning("Error: '%s'. Queued '%s' for retry.", error, item)
+            self.retry_queue.append((item, text, attempts))
+
+
+    @staticmethod
+    def _timed(chain):
+        """``chain`` with the wall time of each card's call recorded"""
+        def invoke(inputs, config):
+            with EXTRACT_SECONDS.time(stage="card"):
+                return chain.invoke(inputs, config)
+        return RunnableLambda(invoke)
+
+
+    def _run_round(self, pending):
+        """Send ``pending`` once and return (results, quota-limited items)"""
+        chain = self._timed(self.chain or get_feature_extractor_chain())
+        with EXTRACT_SECONDS.time(stage="batch"):
+            outputs = chain.batch([{"product_information": text} for _, text, _ in pending],
+                                  config={"max_concurrency": self.concurrency},
+                                  return_exceptions=True)
+        results, throttled = [], []
+
+        for (item, text, attempts), output in zip(pending, outputs):
+            attempts += 1
+            if output is None:
+                output = ValueError("No structured output returned")
+
+            if not isinstance(output, Exception):
+                if self.cache is not None:
+                    self.cache.put(text, output)
+                results.append((item, text, output))
+            elif is_quota_error(output) and attempts < self.max_attempts:
+                throttled.append((item, text, attempts))
+            else:
+                self._record_failure(item, text, attempts, output)
+
+        return results, throttled
+
+
+    def _adapt(self, throttled):
+        if throttled:
+            self.concurrency = max(1, self.concurrency // 2)
+            self._backoff = min(self.backoff_max, max(self.backoff_base, 2 * self._backoff))
+            LOGGER.warning("Quota exhausted for %d card(s). Backing off %.0fs at concurrency %d...",
+                           len(throttled), self._backoff, self.concurrency)
+            time.sleep(self._backoff)
+        else:
+            self.concurrency = min(self.max_in_flight, self.concurrency + 1)
+            self._backoff = 0.0
+
+
+    def extract(self, items):
+        """Extract features for ``(item, text)`` pairs plus any queued retries.
+
+        Returns ``(item, text, CardFeatures)`` triples for every success.
+        """
+        pending = list(self.retry_queue) + [(item, text, 0) for item, text in items]
+        self.retry_queue.clear()
+        start = time.perf_counter()
+        results, cached = [], 0
+
+        if self.cache is not None:
+            misses = []
+            for item, text, attempts in pending:
+                card_features = self.cache.get(text)
+                if card_features is None:
+                    misses.append((item, text, attempts))
+                else:
+                    results.append((item, text, card_features))
+            cached, pending = len(results), misses
+
+        while pending:
+            extracted, pending = self._run_round(pending)
+            results.extend(extracted)
+            self._adapt(pending)
+
+        elapsed = time.perf_counter() - start
+        extracted = len(results) - cached
+        LOGGER.info("Batch: %d card(s) extracted, %d cached, %d queued for retry in %.1fs "
+                    "(%.1f cards/min, concurrency %d)",
+                    extracted, cached, len(self.retry_queue), elapsed,
+                    60 * extracted / elapsed if elapsed else 0.0, self.concurrency)
+        return results
+
+
+    def drain(self):
+        """Retry queued cards until they succeed or run out of attempts"""
+        results = []
+        while self.retry_queue:
+            results.extend(self.extract([]))
+        return results
@@ -1,10 +1,12 @@
 from typing import List
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.rate_limiters import InMemoryRateLimiter
-from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel, Field
 
+from .metrics import TokenUsageCallback
+from .rate_limiter import BULK, SharedRateLimiter
+from .resources import lazy_singleton
+
 
 class MerchantOffers(BaseModel):
     merchant_brand: str | None = Field(...,
@@ -93,7 +95,7 @@ You are a highly skilled credit card information extraction expert. Your task is
 
 **Input:**
 
-You will be provided with a text-based credit card product summary containing the following information:
+You will be provided with a text-based credit card product summary containing some of the following information (fields with nothing to report are left out, and long ones may be cut short with '…'):
 
 *   Product Name:
 *   Product Description:
@@ -157,10 +159,23 @@ Carefully read the provided credit card product summary and extract the followin
 )
 
 
-rate_limiter = InMemoryRateLimiter(requests_per_second=0.2,
-                                   check_every_n_seconds=0.1,
-                                   max_bucket_size=10)
-feature_extractor_model = ChatGoogleGenerativeAI(model="gemini-2.0-flash-001",
-                                                 rate_limiter=rate_limiter)
-FEATURE_EXTRACTOR_CHAIN = (profiler_prompt | 
-                           feature_extractor_model.with_structured_output(CardFeatures))
+FEATURE_EXTRACTOR_MODEL = "gemini-2.0-flash-001"
+
+rate_limiter = SharedRateLimiter(name="feature_extractor", priority=BULK)
+
+
+@lazy_singleton
+def get_feature_extractor_chain():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    feature_extractor_model = ChatGoogleGenerativeAI(model=FEATURE_EXTRACTOR_MODEL,
+                                                     rate_limiter=rate_limiter,
+                                                     callbacks=[TokenUsageCallback("feature_extractor")])
+    return (profiler_prompt |
+            feature_extractor_model.with_structured_output(CardFeatures))
+
+
+def __getattr__(name):
+    if name == "FEATURE_EXTRACTOR_CHAIN":
+        return get_feature_extractor_chain()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,10 +1,12 @@
 from typing import List
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.rate_limiters import InMemoryRateLimiter
-from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel, Field
 
+from .metrics import TokenUsageCallback
+from .rate_limiter import INTERACTIVE, SharedRateLimiter
+from .resources import lazy_singleton
+
 
 class CardFilters(BaseModel):
 
@@ -78,10 +80,23 @@ You are an AI assistant specializing in extracting query intent for credit card
 )
 
 
-rate_limiter = InMemoryRateLimiter(requests_per_second=0.2,
-                                   check_every_n_seconds=0.1,
-                                   max_bucket_size=10)
-query_parser_model = ChatGoogleGenerativeAI(model="gemini-2.0-flash-001",
-                                                 rate_limiter=rate_limiter)
-QUERY_PARSER_CHAIN = (query_parser_prompt | 
-                      query_parser_model.with_structured_output(CardFilters))
+QUERY_PARSER_MODEL = "gemini-2.0-flash-001"
+
+rate_limiter = SharedRateLimiter(name="query_parser", priority=INTERACTIVE)
+
+
+@lazy_singleton
+def get_query_parser_chain():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    query_parser_model = ChatGoogleGenerativeAI(model=QUERY_PARSER_MODEL,
+                                                rate_limiter=rate_limiter,
+                                                callbacks=[TokenUsageCallback("query_parser")])
+    return (query_parser_prompt |
+            query_parser_model.with_structured_output(CardFilters))
+
+
+def __getattr__(name):
+    if name == "QUERY_PARSER_CHAIN":
+        return get_query_parser_chain()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,7 +3,13 @@ from typing import TypedDict
 from langgraph.graph import END, START, StateGraph
 
 from utils.logging_config import LOGGER
-from utils.card_features import FEATURE_EXTRACTOR_CHAIN, CardFeatures
+from utils.card_features import CardFeatures, get_feature_extractor_chain
+from utils.feature_cache import FeatureCache
+from utils.metrics import timed_node
+from utils.resources import lazy_singleton
+
+
+get_feature_cache = lazy_singleton(FeatureCache)
 
 
 class GraphState(TypedDict):
@@ -11,10 +17,21 @@ class GraphState(TypedDict):
     card_features: CardFeatures | None
 
 
+@timed_node("feature_extractor")
 def parse_card_features_node(state: GraphState) -> GraphState:
     """Use the profiler chain to extract fields from the user input"""
-    LOGGER.info("Parsing Product Information...")
-    card_features = FEATURE_EXTRACTOR_CHAIN.invoke({"product_information": state["product_information"]})
+    product_information = state["product_information"]
+    feature_cache = get_feature_cache()
+    card_features = feature_cache.get(product_information)
+
+    if card_features is None:
+        LOGGER.info("Parsing Product Information...")
+        card_features = get_feature_extractor_chain().invoke({"product_information": product_information})
+        if card_features is not None:
+            feature_cache.put(product_information, card_features)
+    else:
+        LOGGER.info("Product Information unchanged. Using cached features...")
+
     state["card_features"] = card_features
     return state
 
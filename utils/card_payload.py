@@ -0,0 +1,91 @@
+import re
+
+from uuid import NAMESPACE_URL, uuid5
+
+NON_ALNUM_PATTERN = re.compile(r'[^0-9a-z]+')
+EMPTY_VALUES = {"", "na", "n/a", "nil", "none", "null", "not available", "no"}
+# Bump whenever build_payload derives the indexed fields differently
+PAYLOAD_VERSION = 1
+
+# Boolean payload fields and the CardFeatures fields that imply them
+FLAG_SOURCES = {
+    "has_movie_benefits": ["movie_benefits"],
+    "has_dining_benefits": ["dining_benefits"],
+    "has_travel_benefits": ["travel_benefits"],
+    "has_domestic_lounge_access": ["domestic_lounge_access_annual",
+                                   "domestic_lounge_access_quarterly"],
+    "has_international_lounge_access": ["international_lounge_access_annual",
+                                        "international_lounge_access_quarterly"],
+    "has_golf_benefits": ["golf_benefits"],
+    "has_insurance_benefits": ["insurance_benefits"],
+}
+
+# CardFilters fields that become range clauses, and the payload field they bound
+RANGE_FILTER_KEYS = {"acceptable_fees": "renewal_fee"}
+
+# Spellings of the same merchant, after case and spacing are folded
+MERCHANT_ALIASES = {
+    "amazonin": "amazon",
+    "amazonindia": "amazon",
+    "bb": "bigbasket",
+    "bbnow": "bigbasket",
+    "bms": "bookmyshow",
+    "goindigo": "indigo",
+    "indigoairlines": "indigo",
+    "6e": "indigo",
+    "mmt": "makemytrip",
+    "myntrafashion": "myntra",
+    "uberindia": "uber",
+    "zomatogold": "zomato",
+}
+
+# Payload fields filtered on at query time, with the Qdrant index type they need
+PAYLOAD_INDEXES = {
+    **{f"metadata.{flag}": "bool" for flag in FLAG_SOURCES},
+    "metadata.renewal_fee": "integer",
+    "metadata.joining_fee": "integer",
+    "metadata.categories": "keyword",
+    "metadata.merchant_brands": "keyword",
+    "metadata.card_url": "keyword",
+    "metadata.card_id": "keyword",
+}
+
+
+def normalize_category(category):
+    return " ".join(NON_ALNUM_PATTERN.sub(" ", category.lower()).split())
+
+
+def normalize_merchant(name):
+    key = NON_ALNUM_PATTERN.sub("", name.lower())
+    return MERCHANT_ALIASES.get(key, key)
+
+
+def card_id(card_url):
+    """Stable identifier shared by every point indexed for a card"""
+    return str(uuid5(NAMESPACE_URL, card_url)) if card_url else None
+
+
+def _present(value):
+    if isinstance(value, (int, float)):
+        return value > 0
+    if isinstance(value, str):
+        return value.strip().lower() not in EMPTY_VALUES
+    return bool(value)
+
+
+def build_payload(card_features, card_url=None):
+    """``CardFeatures`` as a metadata dict plus the derived fields filters run on"""
+    metadata = card_features.model_dump()
+
+    for flag, sources in FLAG_SOURCES.items():
+        metadata[flag] = any(_present(metadata.get(source)) for source in sources)
+
+    metadata["categories"] = sorted({normalize_category(category)
+                                     for category in metadata.get("best_suited_categories") or []
+                                     if normalize_category(category)})
+    metadata["merchant_brands"] = sorted({normalize_merchant(offer["merchant_brand"])
+                                          for offer in metadata.get("merchant_offers") or []
+                                          if offer.get("merchant_brand") and normalize_merchant(offer["merchant_brand"])})
+    metadata["card_url"] = card_url
+    metadata["card_id"] = card_id(card_url)
+    return metadata
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+from functools import cache
+
+from .card_payload import PAYLOAD_VERSION
+from .config import (CHUNK_OVERLAP, CHUNK_SIZE, COLLECTION_NAME,
+                     EMBEDDING_BACKEND, EMBEDDING_MODEL, INDEX_MODE,
+                     LOCAL_INDEX_DIR, MANIFEST_PATH, QDRANT_URL,
+                     VECTOR_BACKEND)
+from .feature_cache import extractor_version
+
+SQLITE_MAX_VARIABLES = 900
+
+
+@cache
+def index_settings():
+    """Everything besides the card text that decides the points a card turns
+    into and where they are: extraction, payload derivation, chunking,
+    embedding and the store they are written to"""
+    store = LOCAL_INDEX_DIR if VECTOR_BACKEND == "local" else f"{QDRANT_URL}/{COLLECTION_NAME}"
+    return ":".join(map(str, [extractor_version(), PAYLOAD_VERSION, INDEX_MODE, CHUNK_SIZE, CHUNK_OVERLAP,
+                              EMBEDDING_BACKEND, EMBEDDING_MODEL, VECTOR_BACKEND, store]))
+
+
+def fingerprint(card_text, settings=None):
+    settings = index_settings() if settings is None else settings
+    return hashlib.sha256(f"{settings}\0{card_text}".encode()).hexdigest()
+
+
+class CatalogManifest:
+    """What the vector store holds for each card: its URL, the fingerprint of
+    the text and ``index_settings`` it was indexed with, and when the card
+    was last listed.
+
+    An ingest run marks every listed card as seen, indexes only cards whose
+    fingerprint is new or different, and afterwards lists the cards that were
+    not seen since it started, so their points can be deleted.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cards (
+                url TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                last_seen REAL NOT NULL,
+                indexed_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+
+
+    def status(self, url, fingerprint):
+        """``new``, ``changed`` or ``unchanged`` compared with what was indexed"""
+        with self._lock:
+            row = self._conn.execute("SELECT fingerprint FROM cards WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return "new"
+        return "unchanged" if row[0] == fingerprint else "changed"
+
+
+    def seen(self, urls, at):
+        with self._lock:
+            self._conn.executemany("UPDATE cards SET last_seen = MAX(last_seen, ?) WHERE url = ?",
+                                   [(at, url) for url in urls])
+            self._conn.commit()
+
+
+    def record(self, fingerprints, at):
+        """Note the fingerprints of cards whose points were just written"""
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO cards VALUES (?, ?, ?, ?)",
+                                   [(url, fingerprint, at, at) for url, fingerprint in fingerprints.items()])
+            self._conn.commit()
+
+
+    def stale(self, before):
+        """Cards not listed since ``before``"""
+        with self._lock:
+            return [url for url, in self._conn.execute("SELECT url FROM cards WHERE last_seen < ?", (before,))]
+
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cards")
+            self._conn.commit()
+
+
+    def remove(self, urls):
+        urls = list(urls)
+        with self._lock:
+            for i in range(0, len(urls), SQLITE_MAX_VARIABLES):
+                chunk = urls[i:i + SQLITE_MAX_VARIABLES]
+                self._conn.execute(f"DELETE FROM cards WHERE url IN ({','.join('?' * len(chunk))})", chunk)
+            self._conn.commit()
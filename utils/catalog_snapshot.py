@@ -0,0 +1,175 @@
+"""Columnar snapshot of the extracted card catalog.
+
+    python -m utils.catalog_snapshot
+
+Ingest writes one row per card to ``cards.arrow`` (the indexed payload:
+``CardFeatures`` plus the derived flags) and one row per merchant offer to
+``merchant_offers.arrow``, keyed by ``card_id``. Both are uncompressed Arrow
+IPC files, so loading them memory-maps the columns instead of parsing
+anything. Running the module prints a short report computed on the columns.
+"""
+import json
+import os
+
+import numpy as np
+
+from .card_payload import FLAG_SOURCES, normalize_merchant
+from .config import CATALOG_SNAPSHOT_DIR
+from .logging_config import LOGGER
+
+CARDS_FILE = "cards.arrow"
+OFFERS_FILE = "merchant_offers.arrow"
+
+
+def _schemas():
+    import pyarrow as pa
+
+    strings = pa.list_(pa.string())
+    cards = pa.schema([
+        ("card_id", pa.string()),
+        ("card_url", pa.string()),
+        ("product_name", pa.string()),
+        ("joining_fee", pa.int64()),
+        ("renewal_fee", pa.int64()),
+        ("waiver_amount", pa.int64()),
+        ("foreign_currency_markup", pa.float64()),
+        ("domestic_lounge_access_annual", pa.int64()),
+        ("domestic_lounge_access_quarterly", pa.int64()),
+        ("international_lounge_access_annual", pa.int64()),
+        ("international_lounge_access_quarterly", pa.int64()),
+        ("best_suited_categories", strings),
+        ("rewards_type", strings),
+        ("welcome_benefits", pa.string()),
+        ("movie_benefits", pa.string()),
+        ("dining_benefits", pa.string()),
+        ("travel_benefits", pa.string()),
+        ("golf_benefits", pa.string()),
+        ("insurance_benefits", pa.string()),
+        *((flag, pa.bool_()) for flag in FLAG_SOURCES),
+        ("categories", strings),
+        ("merchant_brands", strings),
+    ])
+    offers = pa.schema([
+        ("card_id", pa.string()),
+        ("merchant_brand", pa.string()),
+        ("merchant", pa.string()),
+        ("offer", pa.string()),
+    ])
+    return cards, offers
+
+
+def _offer_rows(payload):
+    for offer in payload.get("merchant_offers") or []:
+        brand = offer.get("merchant_brand")
+        merchant = normalize_merchant(brand) if brand else None
+        # A merchant listed without offer texts still gets a row
+        for text in offer.get("offers") or [None]:
+            yield {"card_id": payload["card_id"], "merchant_brand": brand,
+                   "merchant": merchant or None, "offer": text}
+
+
+class CatalogSnapshot:
+    """Arrow tables of every indexed card and its merchant offers"""
+
+    def __init__(self, path=CATALOG_SNAPSHOT_DIR):
+        self.path = path
+        self._tables = None
+
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+
+    def exists(self):
+        return os.path.exists(self._file(CARDS_FILE)) and os.path.exists(self._file(OFFERS_FILE))
+
+
+    def _read(self, name):
+        import pyarrow as pa
+
+        # Column buffers point into the mapping, which stays open while they are referenced
+        return pa.ipc.open_file(pa.memory_map(self._file(name), "r")).read_all()
+
+
+    def tables(self):
+        """``(cards, merchant_offers)`` as memory-mapped ``pyarrow.Table``s"""
+        if self._tables is None:
+            if self.exists():
+                self._tables = self._read(CARDS_FILE), self._read(OFFERS_FILE)
+            else:
+                self._tables = tuple(schema.empty_table() for schema in _schemas())
+        return self._tables
+
+
+    def frames(self):
+        """``(cards, merchant_offers)`` as pandas DataFrames"""
+        cards, offers = self.tables()
+        return cards.to_pandas(), offers.to_pandas()
+
+
+    def arrays(self, columns):
+        """``{column: ndarray}`` for card columns; missing numbers are NaN"""
+        cards, _ = self.tables()
+        return {column: cards.column(column).to_numpy() for column in columns}
+
+
+    def _write(self, name, table):
+        import pyarrow as pa
+
+        path = self._file(name)
+        with pa.OSFile(f"{path}.tmp", "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(f"{path}.tmp", path)
+
+
+    def update(self, payloads, removed=()):
+        """Replace the rows of the cards in ``payloads`` and drop the ``removed`` card ids"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        payloads = [payload for payload in payloads if payload.get("card_id")]
+        replaced = pa.array({payload["card_id"] for payload in payloads} | set(removed), type=pa.string())
+        if not len(replaced):
+            return
+
+        card_schema, offer_schema = _schemas()
+        cards, offers = self.tables()
+        cards = cards.filter(pc.invert(pc.is_in(cards["card_id"], replaced)))
+        offers = offers.filter(pc.invert(pc.is_in(offers["card_id"], replaced)))
+
+        new_cards = pa.Table.from_pylist([{field: payload.get(field) for field in card_schema.names}
+                                          for payload in payloads], schema=card_schema)
+        new_offers = pa.Table.from_pylist([row for payload in payloads for row in _offer_rows(payload)],
+                                          schema=offer_schema)
+
+        os.makedirs(self.path, exist_ok=True)
+        self._write(CARDS_FILE, pa.concat_tables([cards, new_cards]).combine_chunks())
+        self._write(OFFERS_FILE, pa.concat_tables([offers, new_offers]).combine_chunks())
+        self._tables = None
+        LOGGER.info("Catalog snapshot: %d card(s) updated, %d removed", len(payloads), len(set(removed)))
+
+
+def report(snapshot):
+    cards, offers = snapshot.tables()
+    arrays = snapshot.arrays(["renewal_fee", "joining_fee", "domestic_lounge_access_annual",
+                              "international_lounge_access_annual"])
+    fees = arrays["renewal_fee"].astype(np.float64)
+    merchants, counts = np.unique(offers["merchant"].drop_null().to_numpy(zero_copy_only=False),
+                                  return_counts=True)
+    top = np.argsort(-counts)[:10]
+    return {
+        "cards": cards.num_rows,
+        "merchant_offers": offers.num_rows,
+        "lifetime_free": int(np.sum(fees == 0)),
+        "renewal_fee_percentiles": dict(zip(("p25", "p50", "p75"),
+                                            np.nanpercentile(fees, [25, 50, 75]).tolist()))
+                                   if np.isfinite(fees).any() else {},
+        "with_domestic_lounge": int(np.sum(arrays["domestic_lounge_access_annual"].astype(np.float64) > 0)),
+        "with_international_lounge": int(np.sum(
+            arrays["international_lounge_access_annual"].astype(np.float64) > 0)),
+        "top_merchants": {str(merchants[i]): int(counts[i]) for i in top},
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(report(CatalogSnapshot()), indent=2))
@@ -0,0 +1,44 @@
+import os
+import threading
+
+from .config import CHECKPOINT_PATH
+
+
+class CheckpointLog:
+    """Append-only, fsynced log of card URLs that made it into the vector store"""
+
+    def __init__(self, path=CHECKPOINT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._done = set()
+
+        if os.path.exists(path):
+            with open(path) as f:
+                self._done = {line.strip() for line in f if line.strip()}
+
+
+    def __contains__(self, url):
+        return url in self._done
+
+
+    def __len__(self):
+        return len(self._done)
+
+
+    def mark(self, urls):
+        with self._lock:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.writelines(f"{url}\n" for url in urls)
+                f.flush()
+                os.fsync(f.fileno())
+            self._done.update(urls)
+
+
+    def reset(self):
+        """Forget progress once a crawl has completed, so the next one starts fresh"""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._done.clear()
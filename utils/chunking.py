@@ -0,0 +1,42 @@
+from uuid import UUID, uuid5
+
+from langchain_core.documents import Document
+
+from .config import CHUNK_OVERLAP, CHUNK_SIZE, INDEX_MODE
+from .resources import lazy_singleton
+
+# Payload field that ties the chunks of one card together
+GROUP_KEY = "card_id"
+
+
+@lazy_singleton
+def get_text_splitter():
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+
+def chunk_records(card_summary, metadata, mode=INDEX_MODE):
+    """``(page_content, metadata)`` pairs to embed and index for one card.
+
+    In ``chunk`` mode the summary is split to fit the embedding model's
+    window and every chunk carries the card's payload plus its position;
+    otherwise the whole summary is a single record.
+    """
+    if mode != "chunk":
+        return [(card_summary, metadata)]
+    chunks = get_text_splitter().split_text(card_summary)
+    return [(chunk, {**metadata, "chunk_index": i, "chunk_count": len(chunks)})
+            for i, chunk in enumerate(chunks)]
+
+
+def point_id(metadata):
+    """Deterministic point id: the card's own id, or one derived from it per chunk"""
+    if "chunk_index" not in metadata:
+        return metadata[GROUP_KEY]
+    return str(uuid5(UUID(metadata[GROUP_KEY]), str(metadata["chunk_index"])))
+
+
+def chunk_documents(docs, mode=INDEX_MODE):
+    return [Document(page_content=text, metadata=metadata)
+            for doc in docs
+            for text, metadata in chunk_records(doc.page_content, doc.metadata, mode)]
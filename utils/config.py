@@ -0,0 +1,120 @@
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def _env_optional_float(name):
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if not value:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+# Crawler
+BASE_URL = os.environ.get("CARDINSIDER_BASE_URL", "https://cardinsider.com")
+CRAWL_MODE = os.environ.get("CRAWL_MODE", "stream")  # stream, concurrent or sequential
+CRAWL_MAX_WORKERS = _env_int("CRAWL_MAX_WORKERS", 16)
+CRAWL_PER_HOST_LIMIT = _env_int("CRAWL_PER_HOST_LIMIT", 4)
+CRAWL_PARSE_WORKERS = _env_int("CRAWL_PARSE_WORKERS", os.cpu_count() or 1)
+CRAWL_MAX_RETRIES = _env_int("CRAWL_MAX_RETRIES", 3)
+CRAWL_BACKOFF_FACTOR = _env_float("CRAWL_BACKOFF_FACTOR", 0.5)
+CRAWL_TIMEOUT = _env_float("CRAWL_TIMEOUT", 30.0)
+CRAWL_OFFLINE = _env_bool("CRAWL_OFFLINE", False)  # replay pages from the snapshot archive only
+
+# Caches
+CACHE_DIR = os.environ.get("CACHE_DIR", ".cache")
+FEATURE_CACHE_PATH = os.environ.get("FEATURE_CACHE_PATH", os.path.join(CACHE_DIR, "card_features.sqlite"))
+EMBEDDING_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", os.path.join(CACHE_DIR, "embeddings"))
+EMBEDDING_CACHE_DTYPE = os.environ.get("EMBEDDING_CACHE_DTYPE", "float32")
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", os.path.join(CACHE_DIR, "snapshots"))
+MERCHANT_INDEX_PATH = os.environ.get("MERCHANT_INDEX_PATH", os.path.join(CACHE_DIR, "merchant_index.json"))
+CHECKPOINT_PATH = os.environ.get("CHECKPOINT_PATH", os.path.join(CACHE_DIR, "ingest_checkpoint.log"))
+MANIFEST_PATH = os.environ.get("MANIFEST_PATH", os.path.join(CACHE_DIR, "catalog_manifest.sqlite"))
+CATALOG_SNAPSHOT_DIR = os.environ.get("CATALOG_SNAPSHOT_DIR", os.path.join(CACHE_DIR, "catalog"))
+
+# Ingest pipeline
+PIPELINE_BATCH_SIZE = _env_int("PIPELINE_BATCH_SIZE", 16)
+PIPELINE_QUEUE_SIZE = _env_int("PIPELINE_QUEUE_SIZE", 64)
+
+# Indexing
+INDEX_MODE = os.environ.get("INDEX_MODE", "card")  # card (one point per card) or chunk
+CHUNK_SIZE = _env_int("CHUNK_SIZE", 500)
+CHUNK_OVERLAP = _env_int("CHUNK_OVERLAP", 100)
+UPSERT_BATCH_SIZE = _env_int("UPSERT_BATCH_SIZE", 256)
+UPSERT_PARALLEL = _env_int("UPSERT_PARALLEL", 4)  # upload workers once a write spans several batches
+
+# Vector quantization
+VECTOR_QUANTIZATION = os.environ.get("VECTOR_QUANTIZATION", "none")  # none, int8 or binary
+QUANTIZATION_QUANTILE = _env_float("QUANTIZATION_QUANTILE", 0.99)  # share of components the int8 range covers
+QUANTIZATION_OVERSAMPLING = _env_float("QUANTIZATION_OVERSAMPLING", 3.0)  # shortlist k * this on quantized scores
+QUANTIZATION_RESCORE = _env_bool("QUANTIZATION_RESCORE", True)  # rescore the shortlist with the original vectors
+
+# Feature extraction
+EXTRACT_MAX_IN_FLIGHT = _env_int("EXTRACT_MAX_IN_FLIGHT", 4)
+EXTRACT_MAX_ATTEMPTS = _env_int("EXTRACT_MAX_ATTEMPTS", 3)
+EXTRACT_BACKOFF_BASE = _env_float("EXTRACT_BACKOFF_BASE", 10.0)
+EXTRACT_BACKOFF_MAX = _env_float("EXTRACT_BACKOFF_MAX", 300.0)
+COMPACT_CARD_TEXT = _env_bool("COMPACT_CARD_TEXT", True)  # card text without empty/repeated fields, budgeted
+CARD_FIELD_TOKEN_BUDGET = _env_int("CARD_FIELD_TOKEN_BUDGET", 512)
+CARD_TOKEN_BUDGET = _env_int("CARD_TOKEN_BUDGET", 1536)
+
+# LLM rate limit, one token bucket shared by every process and chain
+LLM_RATE_LIMIT_PATH = os.environ.get("LLM_RATE_LIMIT_PATH", os.path.join(CACHE_DIR, "llm_rate_limit.sqlite"))
+LLM_REQUESTS_PER_SECOND = _env_float("LLM_REQUESTS_PER_SECOND", 0.2)
+LLM_MAX_BUCKET_SIZE = _env_int("LLM_MAX_BUCKET_SIZE", 10)
+LLM_CHECK_EVERY_SECONDS = _env_float("LLM_CHECK_EVERY_SECONDS", 0.1)
+LLM_INTERACTIVE_RESERVE = _env_float("LLM_INTERACTIVE_RESERVE", 1.0)  # tokens bulk extraction leaves for queries
+
+# Query intent cache
+INTENT_CACHE_SIZE = _env_int("INTENT_CACHE_SIZE", 1024)
+INTENT_CACHE_TTL = _env_float("INTENT_CACHE_TTL", 3600.0)
+INTENT_CACHE_SEMANTIC_SIZE = _env_int("INTENT_CACHE_SEMANTIC_SIZE", 256)
+INTENT_CACHE_MAX_DISTANCE = _env_optional_float("INTENT_CACHE_MAX_DISTANCE")
+
+# Rule-based query parsing
+FAST_PARSE_MIN_CONFIDENCE = _env_float("FAST_PARSE_MIN_CONFIDENCE", 0.8)
+
+# Retrieval
+RETRIEVE_MAX_CONCURRENCY = _env_int("RETRIEVE_MAX_CONCURRENCY", 4)
+MERCHANT_BOOST = _env_float("MERCHANT_BOOST", 0.1)  # added to the score of a card matching every merchant
+MERCHANT_RERANK_CANDIDATES = _env_int("MERCHANT_RERANK_CANDIDATES", 50)
+
+# Recommendation service
+SERVICE_HOST = os.environ.get("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = _env_int("SERVICE_PORT", 8080)
+SERVICE_MAX_CONCURRENCY = _env_int("SERVICE_MAX_CONCURRENCY", 8)
+SERVICE_MAX_PENDING = _env_int("SERVICE_MAX_PENDING", 64)
+SERVICE_WAIT_FOR_LLM = _env_bool("SERVICE_WAIT_FOR_LLM", False)  # queue on the LLM budget instead of 503
+
+# Metrics
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = _env_int("METRICS_PORT", 0)  # 0 disables the endpoint
+
+# Services
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "qdrant")
+LOCAL_INDEX_DIR = os.environ.get("LOCAL_INDEX_DIR", os.path.join(CACHE_DIR, "local_index"))
+QDRANT_URL = os.environ.get("QDRANT_URL", "http://localhost:6333")
+COLLECTION_NAME = os.environ.get("COLLECTION_NAME", "credit_cards")
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_SIZE = _env_int("EMBEDDING_SIZE", 384)
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "huggingface")  # huggingface (PyTorch) or onnx
+EMBEDDING_ONNX_FILE = os.environ.get("EMBEDDING_ONNX_FILE", "onnx/model.onnx")  # e.g. onnx/model_qint8_avx512.onnx
+EMBEDDING_ONNX_DIR = os.environ.get("EMBEDDING_ONNX_DIR")  # local export instead of the hub repository
+EMBEDDING_BATCH_SIZE = _env_int("EMBEDDING_BATCH_SIZE", 32)
+EMBEDDING_THREADS = _env_int("EMBEDDING_THREADS", 0)  # 0 leaves the thread count to the runtime
+EMBEDDING_MAX_LENGTH = _env_int("EMBEDDING_MAX_LENGTH", 256)
+EMBEDDING_TOLERANCE = _env_float("EMBEDDING_TOLERANCE", 0.02)  # allowed 1 - cosine against the PyTorch model
+IMPORT_BUDGET_SECONDS = _env_float("IMPORT_BUDGET_SECONDS", 1.5)
@@ -0,0 +1,248 @@
+import hashlib
+import inspect
+import sys
+import threading
+
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import credit_card
+from .config import (BASE_URL, CRAWL_BACKOFF_FACTOR, CRAWL_MAX_RETRIES,
+                     CRAWL_MAX_WORKERS, CRAWL_OFFLINE, CRAWL_PARSE_WORKERS,
+                     CRAWL_PER_HOST_LIMIT, CRAWL_TIMEOUT)
+from .credit_card import CreditCard
+from .logging_config import LOGGER
+
+ISSUER_INDEX_PATH = "/card-issuer/"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _parse_issuers(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    issuers = []
+    for issuer in soup.find_all('div', class_='item-new'):
+        a_ = issuer.find('a')
+        issuers.append((a_.text, a_['href']))
+    return issuers
+
+
+def _parse_card_links(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    links = []
+    for card in soup.find_all('div', class_='single_credit_card_box'):
+        a_ = card.find('a', class_='title_list_link')
+        links.append((a_.text, a_['href']))
+    return links
+
+
+def _parse_card(url, html):
+    return CreditCard.from_html(html, url)
+
+
+def parser_version():
+    """Fingerprint of the parsing code, so archived parse results die with it"""
+    source = "".join(inspect.getsource(module) for module in (sys.modules[__name__], credit_card))
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+
+def rebase(url, base_url=BASE_URL):
+    """Resolve ``url`` against ``base_url``, rewriting absolute cardinsider links"""
+    parts = urlsplit(url)
+    if parts.netloc.endswith("cardinsider.com"):
+        url = parts._replace(scheme="", netloc="").geturl()
+    return urljoin(f"{base_url}/", url)
+
+
+class Crawler:
+    """Concurrent cardinsider crawler.
+
+    Pages are fetched on a thread pool through one pooled, retrying
+    ``requests.Session``, with at most ``per_host_limit`` requests in flight
+    per host. The HTML is parsed on a process pool so BeautifulSoup never
+    holds up the network threads. Point ``base_url`` at a local server
+    (see ``benchmarks/stand_in.py``) to crawl saved pages instead of the site.
+    """
+
+    def __init__(self,
+                 base_url=BASE_URL,
+                 max_workers=CRAWL_MAX_WORKERS,
+                 per_host_limit=CRAWL_PER_HOST_LIMIT,
+                 parse_workers=CRAWL_PARSE_WORKERS,
+                 max_retries=CRAWL_MAX_RETRIES,
+                 backoff_factor=CRAWL_BACKOFF_FACTOR,
+                 timeout=CRAWL_TIMEOUT,
+                 snapshots=None,
+                 offline=CRAWL_OFFLINE):
+        if offline and snapshots is None:
+            raise ValueError("Offline replay needs a snapshot store")
+        self.base_url = base_url.rstrip("/")
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.snapshots = snapshots
+        self.offline = offline
+        self._parser_version = parser_version() if snapshots is not None else None
+        self.session = self._build_session(max_workers, max_retries, backoff_factor)
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+        self._fetch_pool = ThreadPoolExecutor(max_workers=max_workers,
+                                              thread_name_prefix="crawler")
+        self._parse_pool = ProcessPoolExecutor(max_workers=parse_workers,
+                                               mp_context=get_context("spawn"))
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def close(self):
+        self._fetch_pool.shutdown(wait=True, cancel_futures=True)
+        self._parse_pool.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+
+
+    @staticmethod
+    def _build_session(pool_size, max_retries, backoff_factor):
+        retry = Retry(total=max_retries,
+                      backoff_factor=backoff_factor,
+                      status_forcelist=RETRY_STATUSES,
+                      allowed_methods=frozenset({"GET"}),
+                      respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size,
+                              max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+
+    def _rebase(self, url):
+        return rebase(url, self.base_url)
+
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self._host_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+
+    def fetch(self, url):
+        return self._fetch(url)[1]
+
+
+    def _fetch(self, url):
+        """``(digest, content)`` of ``url``; the digest is ``None`` without a snapshot store"""
+        if self.offline:
+            return self.snapshots.read(url)
+
+        headers = self.snapshots.validators(url) if self.snapshots is not None else {}
+        with self._host_slot(url):
+            LOGGER.debug("Fetching %s", url)
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and headers:
+            return self.snapshots.read(url, not_modified=True)
+        response.raise_for_status()
+        if self.snapshots is None:
+            return None, response.content
+        digest = self.snapshots.put(url, response.content,
+                                    etag=response.headers.get("ETag"),
+                                    last_modified=response.headers.get("Last-Modified"))
+        return digest, response.content
+
+
+    def _fetch_parsed(self, url, parser, *args):
+        """Fetch ``url`` on the I/O pool, then run ``parser(*args, html)`` on the parse pool"""
+        result = Future()
+
+        def on_parsed(parsed, key):
+            if parsed.exception() is not None:
+                result.set_exception(parsed.exception())
+                return
+            # Resolved first: an exception raised in a done-callback is only logged,
+            # so a failed archive write must not leave the caller waiting
+            result.set_result(parsed.result())
+            if key is not None:
+                try:
+                    self.snapshots.put_parsed(key, parsed.result())
+                except Exception as e:
+                    LOGGER.warning("Could not archive the parsed %s: %s", url, e)
+
+        def on_fetched(fetched):
+            if fetched.exception() is not None:
+                result.set_exception(fetched.exception())
+                return
+            try:
+                digest, html = fetched.result()
+                key = None
+                if digest is not None:
+                    key = self.snapshots.parsed_key(self._parser_version, parser.__name__, digest, args)
+                    try:
+                        cached = self.snapshots.get_parsed(key)
+                    except Exception as e:
+                        LOGGER.warning("Could not read the archived parse of %s: %s", url, e)
+                        cached = None
+                    if cached is not None:
+                        result.set_result(cached)
+                        return
+                self._parse_pool.submit(parser, *args, html).add_done_callback(
+                    lambda parsed: on_parsed(parsed, key))
+            except Exception as e:
+                result.set_exception(e)
+
+        self._fetch_pool.submit(self._fetch, url).add_done_callback(on_fetched)
+        return result
+
+
+    def issuers(self):
+        return self._fetch_parsed(self._rebase(ISSUER_INDEX_PATH), _parse_issuers).result()
+
+
+    def card_links(self, bank_url):
+        """Future of the ``(card_name, card_url)`` pairs listed on an issuer page"""
+        return self._fetch_parsed(self._rebase(bank_url), _parse_card_links)
+
+
+    def fetch_card(self, card_url):
+        """Future of the parsed ``CreditCard`` at ``card_url``"""
+        return self._fetch_parsed(self._rebase(card_url), _parse_card, card_url)
+
+
+    def crawl(self):
+        """Yield ``(bank_name, [(card_name, CreditCard), ...])`` for every issuer.
+
+        Every bank and card page is queued up front, so later issuers are
+        downloading while earlier ones are being consumed.
+        """
+        banks = [(bank_name, self.card_links(bank_url)) for bank_name, bank_url in self.issuers()]
+
+        pending = []
+        for bank_name, links in banks:
+            try:
+                cards = [(card_name, self.fetch_card(card_url)) for card_name, card_url in links.result()]
+            except Exception as e:
+                LOGGER.error("Error: '%s'. Skipping issuer '%s'...", e, bank_name)
+                continue
+            pending.append((bank_name, cards))
+
+        for bank_name, cards in pending:
+            parsed = []
+            for card_name, card in cards:
+                try:
+                    parsed.append((card_name, card.result()))
+                except Exception as e:
+                    LOGGER.error("Error: '%s'. Failed crawling '%s'. Skipping...", e, card_name)
+            yield bank_name, parsed
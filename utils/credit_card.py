@@ -4,20 +4,49 @@ import re
 import requests
 
 from bs4 import BeautifulSoup
+from bs4.filter import ElementFilter
 
-from .utils import json_to_text
+from .config import COMPACT_CARD_TEXT
+from .utils import json_to_compact_text, json_to_text
+
+try:
+    import lxml
+    FAST_BACKEND = 'lxml'
+except ImportError:
+    FAST_BACKEND = 'html.parser'
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 FEE_PATTERN = re.compile(r'(?P<currency>Rs\.?|\u20b9) ?(?P<amount>[\d,]+) \+ GST')
 
+# The only parts of a card page that the parser reads
+SECTION_CLASSES = {'card-main-title', 'content-top-section', 'fees-subpart'}
+SECTION_IDS = {'rewards-and-benefits', 'Fees-Charges', 'Product-Details', 'Pros-Cons'}
+
+
+class _CardSections(ElementFilter):
+    """Only build trees for top-level tags that start a section we read"""
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        attrs = attrs or {}
+        classes = attrs.get('class') or ''
+        if isinstance(classes, str):
+            classes = classes.split()
+        return attrs.get('id') in SECTION_IDS or not SECTION_CLASSES.isdisjoint(classes)
+
+    def allow_string_creation(self, string):
+        return False
+
+
 class CreditCard:
 
-    def __init__(self, url):
-        logger.info("Fetching Data for URL: %s", url)
-        response = requests.get(url)
-        soup = BeautifulSoup(response.content, 'html.parser')
+    def __init__(self, url, html=None, fast=True):
+        if html is None:
+            logger.info("Fetching Data for URL: %s", url)
+            html = requests.get(url).content
+        self.url = url
+        soup = self._soup(html, fast)
         self.product_name = self._get_product_name(soup)
         self.product_description = self._get_product_description(soup)
         self.summary = self._get_summary(soup)
@@ -27,6 +56,19 @@ class CreditCard:
         self.pros_cons = self._get_pros_cons(soup)
 
 
+    @classmethod
+    def from_html(cls, html, url=None, fast=True):
+        """Parse an already fetched card page"""
+        return cls(url, html=html, fast=fast)
+
+
+    @staticmethod
+    def _soup(html, fast):
+        if fast:
+            return BeautifulSoup(html, FAST_BACKEND, parse_only=_CardSections())
+        return BeautifulSoup(html, 'html.parser')
+
+
     @staticmethod
     def _get_product_name(soup):
         return soup.find('h1', class_='card-main-title').text.strip()
@@ -141,6 +183,6 @@ class CreditCard:
         return dict_
 
 
-    def to_text(self):
+    def to_text(self, compact=COMPACT_CARD_TEXT):
         dict_ =  self.to_dict()
-        return json_to_text(dict_)
\ No newline at end of file
+        return json_to_compact_text(dict_) if compact else json_to_text(dict_)
\ No newline at end of file
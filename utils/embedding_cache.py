@@ -0,0 +1,117 @@
+import fcntl
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from langchain_core.embeddings import Embeddings
+
+from .config import EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_DTYPE, EMBEDDING_SIZE
+
+VECTORS_FILE = "vectors.bin"
+INDEX_FILE = "index.sqlite"
+SQLITE_MAX_VARIABLES = 900
+
+
+class CachedEmbeddings(Embeddings):
+    """Persistent embedding cache in front of another ``Embeddings``.
+
+    Vectors are appended as fixed-width rows to a raw ``vectors.bin`` that is
+    read through a memory map; a SQLite table maps the hash of (model, kind,
+    text) to its row. Only texts missing from the cache reach the model, in a
+    single batched call.
+    """
+
+    def __init__(self, embeddings, model_name, path=EMBEDDING_CACHE_DIR,
+                 dim=EMBEDDING_SIZE, dtype=EMBEDDING_CACHE_DTYPE):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.hits = 0
+        self.misses = 0
+        self._row_bytes = dim * self.dtype.itemsize
+        self._vectors_path = os.path.join(path, f"{model_name.replace('/', '_')}.{self.dtype.name}.{VECTORS_FILE}")
+        self._lock = threading.Lock()
+        self._matrix = None
+
+        os.makedirs(path, exist_ok=True)
+        open(self._vectors_path, "ab").close()
+        self._conn = sqlite3.connect(os.path.join(path, INDEX_FILE), check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._conn.commit()
+
+
+    def _key(self, kind, text):
+        return hashlib.sha256(f"{self.model_name}\0{self.dtype.name}\0{kind}\0{text}".encode()).hexdigest()
+
+
+    def _lookup(self, keys):
+        rows = {}
+        for i in range(0, len(keys), SQLITE_MAX_VARIABLES):
+            chunk = keys[i:i + SQLITE_MAX_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            rows.update(self._conn.execute(f"SELECT key, row FROM embeddings WHERE key IN ({placeholders})",
+                                           chunk).fetchall())
+        return rows
+
+
+    def _read(self, rows):
+        if rows and (self._matrix is None or max(rows) >= len(self._matrix)):
+            count = os.path.getsize(self._vectors_path) // self._row_bytes
+            self._matrix = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(count, self.dim))
+        return np.asarray(self._matrix[rows], dtype=np.float32)
+
+
+    def _append(self, keys, vectors):
+        data = np.asarray(vectors, dtype=self.dtype).reshape(len(keys), self.dim)
+        with open(self._vectors_path, "ab") as f:
+            # The file lock keeps rows contiguous when several processes share the cache
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0, os.SEEK_END)
+                first = f.tell() // self._row_bytes
+                f.write(data.tobytes())
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                               [(key, first + i) for i, key in enumerate(keys)])
+        self._conn.commit()
+
+
+    def _embed(self, kind, texts, embed):
+        keys = [self._key(kind, text) for text in texts]
+        with self._lock:
+            rows = self._lookup(keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in rows}
+        self.hits += len(keys) - sum(key in missing for key in keys)
+        self.misses += len(missing)
+
+        if missing:
+            computed = embed(list(missing.values()))
+            with self._lock:
+                self._append(list(missing), computed)
+                rows = self._lookup(keys)
+
+        with self._lock:
+            return self._read([rows[key] for key in keys]).tolist()
+
+
+    def embed_documents(self, texts):
+        return self._embed("document", texts, self.embeddings.embed_documents)
+
+
+    def embed_query(self, text):
+        return self._embed("query", [text], lambda texts: [self.embeddings.embed_query(texts[0])])[0]
+
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,193 @@
+import re
+import threading
+
+from .card_filters import CardFilters
+from .config import FAST_PARSE_MIN_CONFIDENCE
+from .logging_config import LOGGER
+
+DIGIT_GROUP_PATTERN = re.compile(r'(?<=\d),(?=\d)')
+NON_WORD_PATTERN = re.compile(r'[^\w]+')
+TOKEN_PATTERN = re.compile(r'\w+')
+
+AMOUNT = r'(?:rs |inr )?(?P<{0}>\d+)(?: ?(?P<{0}_unit>k|lakh|lac))?'
+PRICED_AMOUNT = r'(?:rs |inr )(?P<{0}>\d+)(?: ?(?P<{0}_unit>k|lakh|lac))?'
+FEE_WORDS = r'(?:(?:annual |joining |renewal |yearly )?(?:fees?|charges?)|price|cost|budget)'
+LIMIT_WORDS = r'(?:up ?to|under|below|less than|within|at most|not more than|max(?:imum)?)'
+LIFETIME_FREE_PATTERN = re.compile(
+    r'\b(?:lifetime free|life time free|ltf|no (?:annual |joining |renewal )?fees?'
+    r'|zero (?:annual |joining |renewal )?fees?)\b'
+)
+# A number only bounds the fee when fee or price words, or a currency, say so:
+# "up to 8 lounge visits" is not a fee limit
+FEE_RANGE_PATTERNS = [re.compile(pattern) for pattern in (
+    rf'\b{FEE_WORDS} (?:of |is )?between ' + AMOUNT.format('low') + r' (?:and|to) ' + AMOUNT.format('high') + r'\b',
+    r'\bbetween ' + AMOUNT.format('low') + r' (?:and|to) ' + AMOUNT.format('high') + rf' {FEE_WORDS}\b',
+    r'\bbetween ' + PRICED_AMOUNT.format('low') + r' (?:and|to) ' + AMOUNT.format('high') + r'\b',
+)]
+FEE_LIMIT_PATTERNS = [re.compile(pattern) for pattern in (
+    rf'\b{LIMIT_WORDS} (?:an? )?{FEE_WORDS}(?: of)? ' + AMOUNT.format('high') + r'\b',
+    rf'\b{LIMIT_WORDS} ' + AMOUNT.format('high') + rf' (?:rupees )?{FEE_WORDS}\b',
+    rf'\b{LIMIT_WORDS} ' + PRICED_AMOUNT.format('high') + r'\b',
+    rf'\b{FEE_WORDS} (?:of |is |should be )?(?:{LIMIT_WORDS} )?' + AMOUNT.format('high') + r'\b',
+)]
+UNIT_MULTIPLIERS = {None: 1, "k": 1_000, "lakh": 100_000, "lac": 100_000}
+
+FLAG_LEXICON = {
+    "has_movie_benefits": r'movies?|cinemas?|films?|bookmyshow|pvr|inox',
+    "has_dining_benefits": r'dining|dine|restaurants?|food|swiggy|zomato',
+    "has_travel_benefits": r'travel(?:l?ing)?|flights?|hotels?|air ?miles|trips?|holidays?',
+    "has_domestic_lounge_access": r'(?:domestic |airport )?lounges?(?: access)?',
+    "has_international_lounge_access": r'international lounges?(?: access)?|priority pass',
+    "has_golf_benefits": r'golf(?:ing)?',
+}
+CATEGORY_LEXICON = {
+    "Entertainment": r'movies?|cinemas?|films?|entertainment',
+    "Dining": r'dining|dine|restaurants?|food',
+    "Travel": r'travel(?:l?ing)?|flights?|hotels?|trips?|holidays?',
+    "Groceries": r'grocery|groceries',
+    "Shopping": r'shop(?:s|ping)?',
+    "Fuel": r'fuel|petrol|diesel',
+}
+FLAG_PATTERNS = {flag: re.compile(rf'\b(?:{words})\b') for flag, words in FLAG_LEXICON.items()}
+CATEGORY_PATTERNS = {category: re.compile(rf'\b(?:{words})\b') for category, words in CATEGORY_LEXICON.items()}
+
+# Words that carry no intent of their own and are ignored when scoring confidence
+STOPWORDS = frozenset("""
+    a an and any are as at be benefit benefits best but by can card cards credit do does for
+    from get give good have i im in is it its like looking me my need of offer offers on
+    or please provide provides recommend show some suggest that the to want which with would
+    you access annual fee fees rs inr
+""".split())
+
+
+def _normalize(text):
+    text = text.lower().replace("₹", " rs ")
+    text = DIGIT_GROUP_PATTERN.sub("", text)
+    return NON_WORD_PATTERN.sub(" ", text).strip()
+
+
+def _compact(text):
+    return NON_WORD_PATTERN.sub("", text.lower())
+
+
+def _search(patterns, text):
+    return next((match for pattern in patterns if (match := pattern.search(text))), None)
+
+
+def _amount(match, group):
+    return int(match.group(group)) * UNIT_MULTIPLIERS[match.group(f"{group}_unit")]
+
+
+class FastQueryParser:
+    """Rule-based ``CardFilters`` extraction for queries that state their
+    constraints literally.
+
+    Fees come from regexes, the ``has_*`` flags and spend categories from
+    keyword lexicons, and merchants from a dictionary of indexed merchant
+    brands. ``parse`` also returns the share of meaningful query words the
+    rules explained, so callers can fall back to the LLM when it is low.
+    """
+
+    def __init__(self, merchant_names=(), merchant_loader=None,
+                 min_confidence=FAST_PARSE_MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+        self._merchant_loader = merchant_loader
+        self._merchants = None
+        self._max_merchant_words = 1
+        self._lock = threading.Lock()
+        if merchant_names:
+            self.set_merchants(merchant_names)
+
+
+    def set_merchants(self, merchant_names):
+        merchants = {}
+        for name in merchant_names:
+            if name and _compact(name):
+                merchants.setdefault(_compact(name), name.strip())
+                self._max_merchant_words = max(self._max_merchant_words, len(TOKEN_PATTERN.findall(name)))
+        self._merchants = merchants
+
+
+    def _merchant_dictionary(self):
+        if self._merchants is None:
+            with self._lock:
+                if self._merchants is None:
+                    try:
+                        self.set_merchants(self._merchant_loader() if self._merchant_loader else ())
+                    except Exception as e:
+                        # Left unset, so the next query tries loading again
+                        LOGGER.error("Error: '%s'. Matching no merchants for this query.", e)
+                        return {}
+        return self._merchants
+
+
+    def _match_merchants(self, tokens):
+        """Greedily match the longest run of tokens that spells a known brand"""
+        merchants = self._merchant_dictionary()
+        found, spans = [], []
+        i = 0
+        while i < len(tokens):
+            for width in range(min(self._max_merchant_words + 1, len(tokens) - i), 0, -1):
+                key = "".join(token.group() for token in tokens[i:i + width])
+                if key in merchants:
+                    if merchants[key] not in found:
+                        found.append(merchants[key])
+                    spans.append((tokens[i].start(), tokens[i + width - 1].end()))
+                    i += width
+                    break
+            else:
+                i += 1
+        return found, spans
+
+
+    def parse(self, query):
+        """Return ``(CardFilters, confidence)`` for ``query``"""
+        text = _normalize(query)
+        tokens = list(TOKEN_PATTERN.finditer(text))
+        spans = []
+
+        acceptable_fees = None
+        if (match := LIFETIME_FREE_PATTERN.search(text)):
+            acceptable_fees = 0
+            spans.append(match.span())
+        elif (match := _search(FEE_RANGE_PATTERNS, text) or _search(FEE_LIMIT_PATTERNS, text)):
+            acceptable_fees = _amount(match, "high")
+            spans.append(match.span())
+
+        flags = {}
+        for flag, pattern in FLAG_PATTERNS.items():
+            matches = list(pattern.finditer(text))
+            flags[flag] = bool(matches)
+            spans.extend(match.span() for match in matches)
+        if flags["has_international_lounge_access"] and not re.search(r'\b(?:domestic|airport) lounge', text):
+            flags["has_domestic_lounge_access"] = False
+
+        categories = []
+        for category, pattern in CATEGORY_PATTERNS.items():
+            matches = list(pattern.finditer(text))
+            if matches:
+                categories.append(category)
+                spans.extend(match.span() for match in matches)
+
+        merchants, merchant_spans = self._match_merchants(tokens)
+        spans.extend(merchant_spans)
+
+        content = [token for token in tokens if token.group() not in STOPWORDS]
+        explained = [token for token in content
+                     if any(start <= token.start() < end for start, end in spans)]
+        confidence = len(explained) / len(content) if content else 0.0
+
+        query_intent = CardFilters(acceptable_fees=acceptable_fees,
+                                   top_spend_categories=categories or None,
+                                   top_merchant_brands=merchants or None,
+                                   **flags)
+        return query_intent, confidence
+
+
+    def try_parse(self, query):
+        """Return ``CardFilters`` when the rules are confident enough, else None"""
+        query_intent, confidence = self.parse(query)
+        if confidence >= self.min_confidence:
+            LOGGER.info("Parsed User Query with rules (confidence %.2f).", confidence)
+            return query_intent
+        return None
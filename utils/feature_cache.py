@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .card_features import FEATURE_EXTRACTOR_MODEL, CardFeatures, profiler_prompt
+from .config import FEATURE_CACHE_PATH
+from .logging_config import LOGGER
+
+
+def extractor_version():
+    """Fingerprint of everything besides the input that shapes an extraction"""
+    payload = json.dumps([FEATURE_EXTRACTOR_MODEL,
+                          profiler_prompt.pretty_repr(),
+                          CardFeatures.model_json_schema()], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class FeatureCache:
+    """On-disk cache of validated ``CardFeatures`` keyed by a hash of the
+    product summary and the extractor version.
+
+    Entries written under an older prompt, schema or model are never returned
+    because the version is part of the key; ``invalidate`` deletes them.
+    """
+
+    def __init__(self, path=FEATURE_CACHE_PATH, version=None):
+        self.path = path
+        self.version = version or extractor_version()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS card_features (
+                key TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                features TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.version}\0{text}".encode()).hexdigest()
+
+
+    def get(self, text):
+        with self._lock:
+            row = self._conn.execute("SELECT features FROM card_features WHERE key = ?",
+                                     (self.key(text),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return CardFeatures.model_validate_json(row[0])
+
+
+    def put(self, text, card_features):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO card_features VALUES (?, ?, ?, ?)",
+                               (self.key(text), self.version,
+                                card_features.model_dump_json(), time.time()))
+            self._conn.commit()
+
+
+    def invalidate(self, version=None):
+        """Delete entries of ``version``, or of every version but the current one"""
+        with self._lock:
+            if version is None:
+                cursor = self._conn.execute("DELETE FROM card_features WHERE version != ?",
+                                            (self.version,))
+            else:
+                cursor = self._conn.execute("DELETE FROM card_features WHERE version = ?",
+                                            (version,))
+            self._conn.commit()
+        if cursor.rowcount:
+            LOGGER.info("Invalidated %d cached extraction(s).", cursor.rowcount)
+        return cursor.rowcount
+
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM card_features")
+            self._conn.commit()
+
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM card_features").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the card feature cache")
+    parser.add_argument("--path", default=FEATURE_CACHE_PATH)
+    parser.add_argument("--invalidate", action="store_true",
+                        help="Drop entries written by an older prompt, schema or model")
+    parser.add_argument("--clear", action="store_true", help="Drop every entry")
+    args = parser.parse_args()
+
+    cache = FeatureCache(args.path)
+    if args.clear:
+        cache.clear()
+    elif args.invalidate:
+        cache.invalidate()
+    print(json.dumps(cache.stats(), indent=2))
@@ -0,0 +1,159 @@
+import re
+import threading
+import time
+
+from collections import OrderedDict
+
+import numpy as np
+
+from .config import (INTENT_CACHE_MAX_DISTANCE, INTENT_CACHE_SEMANTIC_SIZE,
+                     INTENT_CACHE_SIZE, INTENT_CACHE_TTL)
+from .metrics import INTENT_CACHE_EVENTS
+
+NON_WORD_PATTERN = re.compile(r'[^\w]+')
+
+
+def normalize_query(text):
+    return NON_WORD_PATTERN.sub(' ', text.lower()).strip()
+
+
+class _LRUTier:
+
+    def __init__(self, name, max_size, ttl):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+    def record(self, event):
+        setattr(self, event, getattr(self, event) + 1)
+        INTENT_CACHE_EVENTS.inc(tier=self.name, event=event)
+
+
+    def _expired(self, key, now):
+        if self.entries[key][0] <= now:
+            del self.entries[key]
+            self.record("expirations")
+            return True
+        return False
+
+
+    def expire(self, now):
+        """Drop every expired entry; True if there were any"""
+        expired = [key for key, (expires, _) in self.entries.items() if expires <= now]
+        for key in expired:
+            self._expired(key, now)
+        return bool(expired)
+
+
+    def get(self, key, now):
+        if key not in self.entries or self._expired(key, now):
+            self.record("misses")
+            return None
+        self.entries.move_to_end(key)
+        self.record("hits")
+        return self.entries[key][1]
+
+
+    def put(self, key, value, now):
+        self.entries[key] = (now + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.record("evictions")
+
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class IntentCache:
+    """Bounded LRU/TTL cache of ``CardFilters`` keyed on normalized query text.
+
+    When ``embed`` and ``max_distance`` are given, a second tier reuses the
+    intent of a cached query whose embedding lies within ``max_distance``
+    cosine distance of the new one. Each tier's hits, misses, evictions and
+    expirations are counted in ``stats()`` and in ``intent_cache_events_total``.
+    """
+
+    def __init__(self,
+                 max_size=INTENT_CACHE_SIZE,
+                 ttl=INTENT_CACHE_TTL,
+                 embed=None,
+                 max_distance=INTENT_CACHE_MAX_DISTANCE,
+                 semantic_size=INTENT_CACHE_SEMANTIC_SIZE):
+        self.exact = _LRUTier("exact", max_size, ttl)
+        self.semantic = _LRUTier("semantic", semantic_size, ttl) if embed and max_distance is not None else None
+        self.embed = embed
+        self.max_distance = max_distance
+        self._matrix = None
+        self._lock = threading.Lock()
+
+
+    def _embed(self, key):
+        vector = np.asarray(self.embed(key), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+
+    def _nearest(self, vector, now):
+        # Expired entries go before ranking, so the nearest live entry is the one found
+        if self.semantic.expire(now):
+            self._matrix = None
+        if not self.semantic.entries:
+            self.semantic.record("misses")
+            return None
+        if self._matrix is None:
+            self._matrix = (list(self.semantic.entries),
+                            np.stack([v for _, (v, _) in self.semantic.entries.values()]))
+        keys, matrix = self._matrix
+        distances = 1.0 - matrix @ vector
+        best = int(np.argmin(distances))
+        if distances[best] > self.max_distance:
+            self.semantic.record("misses")
+            return None
+        return self.semantic.get(keys[best], now)[1]
+
+
+    def get(self, query):
+        key = normalize_query(query)
+        now = time.monotonic()
+        with self._lock:
+            intent = self.exact.get(key, now)
+            if intent is not None or self.semantic is None or not self.semantic.entries:
+                return intent
+
+        vector = self._embed(key)
+        with self._lock:
+            return self._nearest(vector, now)
+
+
+    def put(self, query, intent):
+        key = normalize_query(query)
+        vector = self._embed(key) if self.semantic is not None else None
+        now = time.monotonic()
+        with self._lock:
+            self.exact.put(key, intent, now)
+            if self.semantic is not None:
+                self.semantic.put(key, (vector, intent), now)
+                self._matrix = None
+
+
+    def stats(self):
+        with self._lock:
+            return {
+                "exact": self.exact.stats(),
+                "semantic": self.semantic.stats() if self.semantic is not None else None,
+            }
@@ -0,0 +1,511 @@
+import fcntl
+import json
+import os
+import threading
+
+from collections.abc import Hashable
+from contextlib import contextmanager
+from uuid import uuid4
+
+import numpy as np
+
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from .config import (EMBEDDING_SIZE, QUANTIZATION_OVERSAMPLING,
+                     QUANTIZATION_RESCORE, VECTOR_QUANTIZATION)
+from .quantization import (approximate_scores, check_mode, encode, fit,
+                           shortlist_size)
+
+VECTORS_FILE = "vectors.f32"
+CODES_FILE = "vectors.{mode}.codes"
+POINTS_FILE = "points.jsonl"
+INDEX_FILE = "index.json"
+LOCK_FILE = ".lock"
+LEGACY_VECTORS_FILE = "vectors.npy"
+LEGACY_PAYLOAD_FILE = "payload.json"
+# Files are rewritten with only the live points once they hold this many times
+# the rows of the last rewrite, so appends cost O(batch) amortized
+COMPACT_FACTOR = 2
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def _as_dict(filter):
+    if filter is None:
+        return {}
+    if hasattr(filter, "model_dump"):
+        return filter.model_dump(exclude_none=True)
+    return filter
+
+
+def _best_per_group(candidates, scores, groups):
+    if groups is None:
+        return candidates, scores
+    # Sort by group, best first within each, and keep each group's first point
+    group = groups[candidates]
+    order = np.lexsort((-scores, group))
+    best = order[np.r_[True, group[order][1:] != group[order][:-1]]]
+    return candidates[best], scores[best]
+
+
+def _map_rows(path, dtype, width):
+    """Memory map of the complete ``width``-wide rows in ``path``"""
+    rows = os.path.getsize(path) // (np.dtype(dtype).itemsize * width) if os.path.exists(path) else 0
+    if not rows:
+        return np.empty((0, width), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows, width))
+
+
+class _Index:
+    """One consistent view of the store. Never modified once built: writes and
+    reloads build a new one and swap it in with a single assignment."""
+
+    def __init__(self, points, vectors, codes, quantization_params, fitted_rows, codes_saved,
+                 log_key=None, log_offset=0):
+        self.points = points  # {id: (row, page_content, metadata)}, in insertion order
+        self.ids = list(points)
+        self.rows = np.fromiter((row for row, _, _ in points.values()), dtype=np.int64, count=len(points))
+        self.page_content = [text for _, text, _ in points.values()]
+        keys = {key for _, _, metadata in points.values() for key in metadata}
+        self.columns = {key: [metadata.get(key) for _, _, metadata in points.values()] for key in keys}
+        self.positions = {id_: i for i, id_ in enumerate(self.ids)}
+
+        self.vectors = vectors  # every row of the vector file, live or not
+        self.codes = codes
+        self.quantization_params = quantization_params
+        self.fitted_rows = fitted_rows
+        self.codes_saved = codes_saved
+        self.log_key = log_key
+        self.log_offset = log_offset
+
+        # Derived lazily by searches; only ever added to
+        self.numeric = {}
+        self.matches = {}
+        self.groups = {}
+
+
+class LocalVectorStore(VectorStore):
+    """In-process exact cosine index over normalized embeddings.
+
+    Vectors are appended to a memory-mapped ``vectors.f32`` and points to a
+    ``points.jsonl`` log (an upsert names the vector row it uses, a delete
+    leaves a tombstone), so a write costs the size of the batch. Once the
+    files hold ``COMPACT_FACTOR`` times the rows of the last rewrite, they
+    are rewritten with the live points only. Searches accept the same
+    must/should/must_not filter dicts as Qdrant, evaluate them column-wise to
+    prune candidates, and score the survivors with a single matmul.
+
+    Each search works on one immutable snapshot of the index, reloaded when
+    the point log changes on disk, so writes from other processes show up
+    and concurrent writes never leave a search with mismatched arrays.
+
+    With ``quantization`` set to ``int8`` or ``binary`` a compact copy of the
+    vectors is kept alongside (``vectors.<mode>.codes``), encoded with the
+    parameters fitted at the last rewrite. Survivors are scored on it, the
+    best ``k * oversampling`` are kept, and with ``rescore`` only those rows
+    of the full-precision vectors are read to order the results.
+    """
+
+    def __init__(self, embedding, path, dim=EMBEDDING_SIZE,
+                 quantization=VECTOR_QUANTIZATION,
+                 oversampling=QUANTIZATION_OVERSAMPLING,
+                 rescore=QUANTIZATION_RESCORE):
+        self.embedding = embedding
+        self.path = path
+        self.dim = dim
+        self.quantization = check_mode(quantization)
+        self.oversampling = oversampling
+        self.rescore = rescore
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._migrate_legacy()
+        with self._file_lock(fcntl.LOCK_SH):
+            self._state = self._read()
+
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, path=None, **kwargs):
+        store = cls(embedding, path, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+
+    def __len__(self):
+        return len(self._current().ids)
+
+
+    @property
+    def ids(self):
+        return self._current().ids
+
+
+    @property
+    def vectors(self):
+        return self._current().vectors
+
+
+    @property
+    def codes(self):
+        return self._current().codes
+
+
+    @property
+    def quantization_params(self):
+        return self._current().quantization_params
+
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+
+    def _codes_file(self):
+        return self._file(CODES_FILE.format(mode=self.quantization))
+
+
+    def _code_width(self):
+        return encode(np.zeros((1, self.dim), dtype=np.float32), self.quantization, {"offset": 0.0, "step": 1.0}).shape[1]
+
+
+    @contextmanager
+    def _file_lock(self, operation):
+        """Shared while reading the files, exclusive while writing them, across processes"""
+        with open(self._file(LOCK_FILE), "a") as f:
+            fcntl.flock(f, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+    def _log_key(self):
+        try:
+            stat = os.stat(self._file(POINTS_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+    def _current(self):
+        """The latest index, reloaded first if the point log changed on disk"""
+        state = self._state
+        if self._log_key() != state.log_key:
+            with self._lock, self._file_lock(fcntl.LOCK_SH):
+                if self._log_key() != self._state.log_key:
+                    self._state = self._read(self._state)
+        return self._state
+
+
+    def _read(self, previous=None):
+        """The index on disk; from ``previous`` only the log records after it are read"""
+        with open(self._file(INDEX_FILE)) as f:
+            saved = json.load(f)
+        vectors = _map_rows(self._file(VECTORS_FILE), np.float32, self.dim)
+
+        points, offset, key = {}, 0, self._log_key()
+        if previous is not None and key and previous.log_key and previous.log_key[0] == key[0]:
+            points, offset = dict(previous.points), previous.log_offset
+        with open(self._file(POINTS_FILE), "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # A record is only complete once its newline is written
+        data = data[:data.rfind(b"\n") + 1]
+        for line in data.splitlines():
+            record = json.loads(line)
+            if record.get("deleted"):
+                points.pop(record["id"], None)
+            else:
+                points[record["id"]] = (record["row"], record["page_content"], record["metadata"])
+
+        codes, params, codes_saved = None, {}, False
+        if self.quantization != "none":
+            quantization = saved.get("quantization") or {}
+            codes = _map_rows(self._codes_file(), np.uint8, self._code_width())
+            if quantization.get("mode") == self.quantization and len(codes) == len(vectors):
+                params, codes_saved = quantization["params"], True
+            else:
+                # Saved with another mode, or cut short: encode now, save at the next write
+                live = np.asarray(vectors[np.fromiter((row for row, _, _ in points.values()), dtype=np.int64)])
+                params = fit(live, self.quantization)
+                codes = encode(np.asarray(vectors), self.quantization, params)
+        return _Index(points, vectors, codes, params, saved.get("rows", 0), codes_saved,
+                      log_key=key, log_offset=offset + len(data))
+
+
+    def _rewrite(self, points, vectors):
+        """Write the files anew holding ``points``, whose rows index ``vectors``"""
+        rows = np.fromiter((row for row, _, _ in points.values()), dtype=np.int64, count=len(points))
+        vectors = np.ascontiguousarray(vectors[rows], dtype=np.float32).reshape(-1, self.dim)
+        saved = {"rows": len(vectors)}
+
+        # Written next to the live files and swapped in, the point log last:
+        # readers hold the shared lock, so they see either all old or all new files
+        with open(self._file(f"{VECTORS_FILE}.tmp"), "wb") as f:
+            f.write(vectors.tobytes())
+        if self.quantization != "none":
+            params = fit(vectors, self.quantization)
+            with open(f"{self._codes_file()}.tmp", "wb") as f:
+                f.write(encode(vectors, self.quantization, params).tobytes())
+            saved["quantization"] = {"mode": self.quantization, "params": params}
+        with open(self._file(f"{INDEX_FILE}.tmp"), "w") as f:
+            json.dump(saved, f)
+        with open(self._file(f"{POINTS_FILE}.tmp"), "w") as f:
+            for row, (id_, (_, text, metadata)) in enumerate(points.items()):
+                f.write(json.dumps({"id": id_, "row": row, "page_content": text, "metadata": metadata}) + "\n")
+
+        os.replace(self._file(f"{VECTORS_FILE}.tmp"), self._file(VECTORS_FILE))
+        if self.quantization != "none":
+            os.replace(f"{self._codes_file()}.tmp", self._codes_file())
+        os.replace(self._file(f"{INDEX_FILE}.tmp"), self._file(INDEX_FILE))
+        os.replace(self._file(f"{POINTS_FILE}.tmp"), self._file(POINTS_FILE))
+
+
+    def _append(self, state, records, vectors):
+        """Append ``vectors`` and the point ``records``, whose rows count from the end of the file"""
+        with open(self._file(VECTORS_FILE), "r+b") as f:
+            # Drop a row left half-written by an interrupted append
+            f.truncate(len(state.vectors) * self.dim * 4)
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        if self.quantization != "none":
+            with open(self._codes_file(), "r+b") as f:
+                f.truncate(len(state.vectors) * self._code_width())
+                f.seek(0, os.SEEK_END)
+                f.write(encode(vectors, self.quantization, state.quantization_params).tobytes())
+        with open(self._file(POINTS_FILE), "a") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+
+
+    def _write(self, upserts=(), vectors=None, deletes=()):
+        """Apply a batch of upserts and deletes on top of the latest index on disk"""
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            state = self._read(self._state) if self._log_key() != self._state.log_key else self._state
+            start = len(state.vectors)
+            records = [{"id": id_, "deleted": True} for id_ in deletes if id_ in state.points]
+            records += [{"id": id_, "row": start + i, "page_content": text, "metadata": metadata}
+                        for i, (id_, text, metadata) in enumerate(upserts)]
+            if not records:
+                return
+            vectors = (np.empty((0, self.dim), dtype=np.float32) if vectors is None
+                       else np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+
+            total = start + len(upserts)
+            if total > COMPACT_FACTOR * state.fitted_rows or (self.quantization != "none" and not state.codes_saved):
+                points = dict(state.points)
+                for record in records:
+                    if record.get("deleted"):
+                        points.pop(record["id"], None)
+                    else:
+                        points[record["id"]] = (record["row"], record["page_content"], record["metadata"])
+                self._rewrite(points, np.concatenate([np.asarray(state.vectors), vectors]))
+                self._state = self._read()
+            else:
+                self._append(state, records, vectors)
+                self._state = self._read(state)
+
+
+    def _migrate_legacy(self):
+        """Convert an index saved as ``vectors.npy`` and columnar ``payload.json``"""
+        with self._file_lock(fcntl.LOCK_EX):
+            if os.path.exists(self._file(INDEX_FILE)):
+                return
+            points, vectors = {}, np.empty((0, self.dim), dtype=np.float32)
+            if os.path.exists(self._file(LEGACY_VECTORS_FILE)) and os.path.exists(self._file(LEGACY_PAYLOAD_FILE)):
+                vectors = np.load(self._file(LEGACY_VECTORS_FILE))
+                with open(self._file(LEGACY_PAYLOAD_FILE)) as f:
+                    payload = json.load(f)
+                columns = payload["metadata"]
+                for row, (id_, text) in enumerate(zip(payload["ids"], payload["page_content"])):
+                    points[id_] = (row, text, {key: values[row] for key, values in columns.items()})
+            self._rewrite(points, vectors)
+
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [str(id_) for id_ in ids] if ids else [str(uuid4()) for _ in texts]
+        new_vectors = _normalize(self.embedding.embed_documents(texts)) if texts else None
+        self.upsert_vectors(ids, new_vectors, texts, metadatas)
+        return ids
+
+
+    def upsert_vectors(self, ids, vectors, texts, metadatas):
+        """Insert or replace points whose embeddings are already computed"""
+        if not ids:
+            return
+        self._write(upserts=list(zip(ids, texts, metadatas)), vectors=_normalize(vectors))
+
+
+    def delete(self, ids=None, **kwargs):
+        if not ids:
+            return False
+        self._write(deletes=[str(id_) for id_ in ids])
+        return True
+
+
+    def payloads(self):
+        """The metadata of every point, in insertion order"""
+        return [metadata for _, _, metadata in self._current().points.values()]
+
+
+    def payload_column(self, key):
+        state = self._current()
+        return state.columns.get(key.removeprefix("metadata."), [None] * len(state.ids))
+
+
+    def _numeric_column(self, state, key):
+        if key not in state.numeric:
+            state.numeric[key] = np.array(
+                [value if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+                 for value in state.columns.get(key, [None] * len(state.ids))],
+                dtype=np.float64,
+            )
+        return state.numeric[key]
+
+
+    def _group_codes(self, state, key):
+        """Integer code per point for the value of ``key``; points without one are their own group"""
+        if key not in state.groups:
+            codes = {}
+            state.groups[key] = np.fromiter(
+                (codes.setdefault(value if value is not None else ("_point", i), len(codes))
+                 for i, value in enumerate(state.columns.get(key, [None] * len(state.ids)))),
+                dtype=np.int64, count=len(state.ids),
+            )
+        return state.groups[key]
+
+
+    def _condition_mask(self, state, condition):
+        if "must" in condition or "should" in condition or "must_not" in condition:
+            return self._filter_mask(state, condition)
+
+        key = condition["key"].removeprefix("metadata.")
+        if "range" in condition:
+            column = self._numeric_column(state, key)
+            mask = np.ones(len(column), dtype=bool)
+            for op, compare in [("lt", np.less), ("lte", np.less_equal),
+                                ("gt", np.greater), ("gte", np.greater_equal)]:
+                if condition["range"].get(op) is not None:
+                    mask &= compare(column, condition["range"][op])
+            return mask
+
+        match = condition["match"]
+        accepted = match["any"] if "any" in match else [match["value"]]
+        positions = self._value_positions(state, key)
+        mask = np.zeros(len(state.ids), dtype=bool)
+        for value in accepted:
+            if value in positions:
+                mask[positions[value]] = True
+        return mask
+
+
+    def _value_positions(self, state, key):
+        """``{value: positions}`` for a payload column, like a payload index.
+
+        Built once per column from the stored values, so its size is bounded by
+        the data whatever values queries ask for; list values index each element.
+        """
+        if key not in state.matches:
+            positions = {}
+            for i, value in enumerate(state.columns.get(key, [None] * len(state.ids))):
+                for element in value if isinstance(value, list) else [value]:
+                    if isinstance(element, Hashable):
+                        positions.setdefault(element, []).append(i)
+            state.matches[key] = {value: np.array(found, dtype=np.int64) for value, found in positions.items()}
+        return state.matches[key]
+
+
+    def _filter_mask(self, state, filter):
+        filter = _as_dict(filter)
+        mask = np.ones(len(state.ids), dtype=bool)
+        for condition in filter.get("must") or []:
+            mask &= self._condition_mask(state, condition)
+        if filter.get("should") is not None:
+            # As in Qdrant, a should clause without conditions matches nothing
+            mask &= np.logical_or.reduce([self._condition_mask(state, c) for c in filter["should"]],
+                                         initial=False)
+        for condition in filter.get("must_not") or []:
+            mask &= ~self._condition_mask(state, condition)
+        return mask
+
+
+    def _document(self, state, position):
+        metadata = {key: values[position] for key, values in state.columns.items()}
+        metadata["_id"] = state.ids[position]
+        return Document(page_content=state.page_content[position], metadata=metadata)
+
+
+    def _scores(self, state, candidates, query, k, groups=None):
+        """Candidates worth returning and their scores against ``query``.
+
+        Without quantization every candidate is scored exactly. Otherwise the
+        best ``k * oversampling`` on the quantized vectors are kept and, with
+        ``rescore``, rescored on the original vectors. ``groups`` reduces the
+        candidates to the best point of each group before anything is cut.
+        """
+        if state.codes is None:
+            scores = state.vectors[state.rows[candidates]] @ query
+            return _best_per_group(candidates, scores, groups)
+
+        scores = approximate_scores(state.codes[state.rows[candidates]], query,
+                                    self.quantization, state.quantization_params)
+        candidates, scores = _best_per_group(candidates, scores, groups)
+        limit = shortlist_size(k, self.oversampling)
+        if len(candidates) > limit:
+            shortlist = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[shortlist], scores[shortlist]
+        if self.rescore:
+            # Sorted by row so the memory map is read front to back
+            candidates = candidates[np.argsort(state.rows[candidates])]
+            scores = state.vectors[state.rows[candidates]] @ query
+        return candidates, scores
+
+
+    def search_by_vectors(self, vectors, filters, k=4, group_by=None):
+        """Top-k ``(Document, score)`` lists for a batch of query vectors.
+
+        With ``group_by`` each group (e.g. the chunks of one card) is scored by
+        its best point and only that point is returned, so the k results
+        belong to k distinct groups.
+        """
+        state = self._current()
+        queries = _normalize(vectors)
+        groups = self._group_codes(state, group_by.removeprefix("metadata.")) if group_by else None
+        results = []
+        for query, filter in zip(queries, filters):
+            candidates = (np.flatnonzero(self._filter_mask(state, filter)) if filter
+                          else np.arange(len(state.ids)))
+            if not len(candidates):
+                results.append([])
+                continue
+            candidates, scores = self._scores(state, candidates, query, k, groups)
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            results.append([(self._document(state, candidates[i]), float(scores[i])) for i in top])
+        return results
+
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return self.search_by_vectors([embedding], [filter], k=k)[0]
+
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query),
+                                                           k=k, filter=filter)
+
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from .card_payload import MERCHANT_ALIASES, normalize_merchant
+from .config import MERCHANT_BOOST, MERCHANT_INDEX_PATH
+
+
+class MerchantIndex:
+    """Inverted index from normalized merchant brand to the cards whose
+    ``merchant_offers`` mention it.
+
+    Built at ingest time and kept as a JSON file next to the other caches.
+    Looking up a brand is a dict access, so re-scoring search candidates by
+    merchant overlap costs the same however large the catalog grows.
+    """
+
+    def __init__(self, path=MERCHANT_INDEX_PATH):
+        self.path = path
+        self.postings = {}
+        self.names = {}
+        self._cards = {}
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.names = data["names"]
+            self.postings = {merchant: set(cards) for merchant, cards in data["postings"].items()}
+            for merchant, cards in self.postings.items():
+                for card_url in cards:
+                    self._cards.setdefault(card_url, set()).add(merchant)
+
+
+    def __len__(self):
+        return len(self._cards)
+
+
+    def add(self, card_url, metadata):
+        """Index (or re-index) the merchant offers in a card's payload"""
+        if not card_url:
+            return
+        with self._lock:
+            self._remove(card_url)
+            merchants = set()
+            for offer in metadata.get("merchant_offers") or []:
+                name = (offer.get("merchant_brand") or "").strip()
+                if name and normalize_merchant(name):
+                    merchants.add(normalize_merchant(name))
+                    self.names.setdefault(normalize_merchant(name), name)
+            for merchant in merchants:
+                self.postings.setdefault(merchant, set()).add(card_url)
+            if merchants:
+                self._cards[card_url] = merchants
+
+
+    def _remove(self, card_url):
+        for merchant in self._cards.pop(card_url, ()):
+            self.postings[merchant].discard(card_url)
+            if not self.postings[merchant]:
+                del self.postings[merchant]
+                del self.names[merchant]
+
+
+    def remove(self, card_url):
+        with self._lock:
+            self._remove(card_url)
+
+
+    def lookup(self, merchant):
+        """Card URLs with an offer from ``merchant``"""
+        return self.postings.get(normalize_merchant(merchant), set())
+
+
+    def spellings(self):
+        """Every known way of writing an indexed merchant, for spotting them in queries"""
+        return [*self.names.values(),
+                *(alias for alias, merchant in MERCHANT_ALIASES.items() if merchant in self.postings)]
+
+
+    def rescore(self, card_urls, scores, merchants, boost=MERCHANT_BOOST):
+        """Add ``boost`` times the share of ``merchants`` each card has offers from"""
+        scores = np.asarray(scores, dtype=np.float64)
+        postings = [self.postings.get(key, set()) for key in dict.fromkeys(map(normalize_merchant, merchants))]
+        if not postings or not len(scores):
+            return scores
+        hits = np.array([[card_url in posting for posting in postings] for card_url in card_urls],
+                        dtype=bool).reshape(len(card_urls), len(postings))
+        return scores + boost * hits.mean(axis=1)
+
+
+    def save(self):
+        if not self.path:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            data = {"names": self.names,
+                    "postings": {merchant: sorted(cards) for merchant, cards in self.postings.items()}}
+        with open(f"{self.path}.tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(f"{self.path}.tmp", self.path)
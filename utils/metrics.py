@@ -0,0 +1,202 @@
+import json
+import threading
+import time
+
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .config import METRICS_HOST, METRICS_PORT
+from .logging_config import LOGGER
+
+NAMESPACE = "cardinsider"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, **extra):
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label set"""
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = f"{NAMESPACE}_{name}"
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+    def prometheus(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, le=bound)} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, le='+Inf')} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+    def snapshot(self):
+        with self._lock:
+            return [{"labels": dict(key),
+                     "count": series["count"],
+                     "sum": series["sum"],
+                     "mean": series["sum"] / series["count"] if series["count"] else 0.0,
+                     "buckets": dict(zip(map(str, self.buckets), series["buckets"]))}
+                    for key, series in sorted(self._series.items())]
+
+
+class Counter:
+
+    def __init__(self, name, help):
+        self.name = f"{NAMESPACE}_{name}"
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+    def prometheus(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines.extend(f"{self.name}{_format_labels(key)} {value}"
+                         for key, value in sorted(self._values.items()))
+        return lines
+
+
+    def snapshot(self):
+        with self._lock:
+            return [{"labels": dict(key), "value": value} for key, value in sorted(self._values.items())]
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = []
+
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.metrics.append(Histogram(name, help, buckets))
+        return self.metrics[-1]
+
+
+    def counter(self, name, help):
+        self.metrics.append(Counter(name, help))
+        return self.metrics[-1]
+
+
+    def prometheus(self):
+        return "\n".join(line for metric in self.metrics for line in metric.prometheus()) + "\n"
+
+
+    def snapshot(self):
+        return {metric.name: metric.snapshot() for metric in self.metrics}
+
+
+REGISTRY = Registry()
+NODE_SECONDS = REGISTRY.histogram("node_seconds", "Wall time per LangGraph node")
+RATE_LIMIT_WAIT_SECONDS = REGISTRY.histogram("rate_limit_wait_seconds", "Time blocked in an LLM rate limiter")
+EMBED_SECONDS = REGISTRY.histogram("embed_seconds", "Time spent embedding texts")
+EXTRACT_SECONDS = REGISTRY.histogram("extract_seconds", "Feature extraction wall time per batch round and per card")
+VECTOR_SEARCH_SECONDS = REGISTRY.histogram("vector_search_seconds", "Vector store search latency")
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "Tokens sent to and received from LLMs")
+CARD_TEXT_TOKENS = REGISTRY.counter("card_text_tokens_total", "Estimated tokens of card texts, full and compact")
+INTENT_CACHE_EVENTS = REGISTRY.counter("intent_cache_events_total",
+                                       "Intent cache hits, misses, evictions and expirations per tier")
+
+
+def timed_node(graph):
+    """Record the wall time of a graph node function under ``graph`` and its name"""
+    def decorate(node):
+        @wraps(node)
+        def timed(state):
+            with NODE_SECONDS.time(graph=graph, node=node.__name__):
+                return node(state)
+        return timed
+    return decorate
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Count input and output tokens reported by chat model responses"""
+
+    def __init__(self, chain):
+        self.chain = chain
+
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    LLM_TOKENS.inc(usage.get("input_tokens", 0), chain=self.chain, kind="input")
+                    LLM_TOKENS.inc(usage.get("output_tokens", 0), chain=self.chain, kind="output")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = REGISTRY.prometheus(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = json.dumps(REGISTRY.snapshot(), indent=2), "application/json"
+        else:
+            self.send_error(404)
+            return
+        body = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve ``/metrics`` (Prometheus text) and ``/metrics.json`` on a daemon thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    LOGGER.info("Serving metrics at http://%s:%d/metrics", host, server.server_address[1])
+    return server
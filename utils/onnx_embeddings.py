@@ -0,0 +1,145 @@
+"""ONNX Runtime backend for the sentence-transformers embedding model.
+
+    python -m utils.onnx_embeddings --check
+
+Runs the model's ONNX export (plain or int8-quantized, as published in the
+model's hub repository) with mean pooling and normalization, as the
+sentence-transformers pipeline does. ``--check`` embeds sample texts with
+both backends and fails if any pair of vectors is further apart than
+EMBEDDING_TOLERANCE.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from langchain_core.embeddings import Embeddings
+
+from .config import (EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_LENGTH,
+                     EMBEDDING_MODEL, EMBEDDING_ONNX_DIR, EMBEDDING_ONNX_FILE,
+                     EMBEDDING_THREADS, EMBEDDING_TOLERANCE)
+from .logging_config import LOGGER
+
+TOKENIZER_FILE = "tokenizer.json"
+SAMPLE_TEXTS = [
+    "lifetime free card with airport lounge access",
+    "cashback on Amazon and Flipkart shopping",
+    "** Product Name: **HDFC Regalia Gold Credit Card\n** Joining Fee: **Rs. 2,500",
+    "5X reward points on dining at partner restaurants and 1% fuel surcharge waiver",
+    "Complimentary golf rounds, travel insurance cover and 2% forex markup",
+]
+
+
+def _repo_id(model_name):
+    # Same shorthand sentence-transformers accepts for its own models
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def _model_files(model_name, onnx_file, onnx_dir):
+    if onnx_dir:
+        return os.path.join(onnx_dir, onnx_file), os.path.join(onnx_dir, TOKENIZER_FILE)
+
+    from huggingface_hub import hf_hub_download
+
+    repo_id = _repo_id(model_name)
+    return hf_hub_download(repo_id, onnx_file), hf_hub_download(repo_id, TOKENIZER_FILE)
+
+
+class OnnxEmbeddings(Embeddings):
+    """Mean-pooled, normalized sentence embeddings from an ONNX Runtime session.
+
+    Texts are sorted by length and embedded ``batch_size`` at a time so each
+    batch pads to similar lengths. ``threads`` caps the intra-op thread pool;
+    0 leaves it to ONNX Runtime.
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL, onnx_file=EMBEDDING_ONNX_FILE,
+                 onnx_dir=EMBEDDING_ONNX_DIR, batch_size=EMBEDDING_BATCH_SIZE,
+                 threads=EMBEDDING_THREADS, max_length=EMBEDDING_MAX_LENGTH):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_path, tokenizer_path = _model_files(model_name, onnx_file, onnx_dir)
+        self.batch_size = batch_size
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id("[PAD]") or 0)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._inputs = {model_input.name for model_input in self.session.get_inputs()}
+
+
+    def _embed_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {"input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+                 "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+        hidden = self.session.run(None, feeds)[0]
+        pooled = (hidden * mask[..., None]).sum(axis=1) / np.maximum(mask.sum(axis=1, keepdims=True), 1)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+
+    def embed(self, texts):
+        """``(len(texts), dim)`` float32 array of normalized embeddings"""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        vectors = None
+        for start in range(0, len(texts), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            embedded = self._embed_batch([texts[i] for i in batch])
+            if vectors is None:
+                vectors = np.empty((len(texts), embedded.shape[1]), dtype=np.float32)
+            vectors[batch] = embedded
+        return vectors
+
+
+    def embed_documents(self, texts):
+        return self.embed(list(texts)).tolist()
+
+
+    def embed_query(self, text):
+        return self.embed([text])[0].tolist()
+
+
+def compare_embeddings(candidate, reference, texts=SAMPLE_TEXTS):
+    """Smallest cosine similarity between the two backends' vectors for ``texts``"""
+    a = np.asarray(candidate.embed_documents(texts), dtype=np.float64)
+    b = np.asarray(reference.embed_documents(texts), dtype=np.float64)
+    a /= np.linalg.norm(a, axis=1, keepdims=True)
+    b /= np.linalg.norm(b, axis=1, keepdims=True)
+    return float((a * b).sum(axis=1).min())
+
+
+def check_embeddings(candidate, reference, texts=SAMPLE_TEXTS, tolerance=EMBEDDING_TOLERANCE):
+    similarity = compare_embeddings(candidate, reference, texts)
+    if similarity < 1.0 - tolerance:
+        raise ValueError(f"Embeddings differ from the reference model: cosine similarity {similarity:.4f} "
+                         f"is below {1.0 - tolerance:.4f}")
+    return similarity
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true",
+                        help="Compare against the PyTorch model and exit non-zero if out of tolerance")
+    args = parser.parse_args()
+
+    if args.check:
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        try:
+            similarity = check_embeddings(OnnxEmbeddings(), HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL))
+        except ValueError as e:
+            LOGGER.error("%s", e)
+            sys.exit(1)
+        LOGGER.info("ONNX embeddings match %s: minimum cosine similarity %.6f", EMBEDDING_MODEL, similarity)
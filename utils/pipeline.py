@@ -0,0 +1,248 @@
+import queue
+import threading
+import time
+
+from .card_payload import build_payload, card_id
+from .catalog_manifest import fingerprint
+from .chunking import chunk_records, point_id
+from .config import PIPELINE_BATCH_SIZE, PIPELINE_QUEUE_SIZE
+from .logging_config import LOGGER
+from .metrics import EMBED_SECONDS
+from .resources import (delete_cards, flush_points, get_embeddings,
+                        stored_payloads, upsert_points)
+
+DONE = object()
+
+
+class PipelineAborted(Exception):
+    pass
+
+
+class IngestPipeline:
+    """Streaming fetch → parse → extract → embed → upsert ingest.
+
+    Each stage runs on its own thread and hands work to the next through a
+    bounded queue, so a slow stage applies back-pressure instead of letting
+    work pile up in memory. Card URLs are written to the checkpoint log only
+    after their points are upserted; an interrupted run skips them when it
+    is started again, and a completed run resets the log.
+
+    With a ``manifest`` the run is incremental: cards whose text fingerprint
+    matches what was last indexed stop after parsing, and once every issuer
+    has been listed, cards that were not listed any more are deleted from the
+    vector store in one go.
+
+    With a ``snapshot`` the payloads of upserted cards, and the removals, are
+    merged into the columnar catalog snapshot when the run ends. A missing
+    snapshot is built from every card in the vector store instead.
+    """
+
+    def __init__(self, crawler, extractor, checkpoint,
+                 batch_size=PIPELINE_BATCH_SIZE,
+                 queue_size=PIPELINE_QUEUE_SIZE,
+                 merchant_index=None, manifest=None, snapshot=None):
+        self.crawler = crawler
+        self.extractor = extractor
+        self.checkpoint = checkpoint
+        self.merchant_index = merchant_index
+        self.manifest = manifest
+        self.snapshot = snapshot
+        self._payloads = {}
+        self._removed = []
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.counts = {"skipped": 0, "crawl_failed": 0, "upserted": 0,
+                       "new": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        self._aborted = threading.Event()
+        self._listed_all = False
+        self._started = None
+
+
+    def _put(self, outbox, item):
+        while True:
+            if self._aborted.is_set():
+                raise PipelineAborted()
+            try:
+                outbox.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+
+    @staticmethod
+    def _drain(inbox):
+        while (item := inbox.get()) is not DONE:
+            yield item
+
+
+    def _batches(self, inbox):
+        batch = []
+        for item in self._drain(inbox):
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+    def _run_stage(self, name, work, inbox, outbox):
+        try:
+            work(inbox, outbox)
+        except PipelineAborted:
+            pass
+        except Exception:
+            LOGGER.exception("Stage '%s' failed. Aborting ingest...", name)
+            self._aborted.set()
+        finally:
+            if outbox is not None:
+                outbox.put(DONE)
+            if inbox is not None and self._aborted.is_set():
+                # Keep draining so the upstream stage is never stuck on a full queue
+                for _ in self._drain(inbox):
+                    pass
+
+
+    def _discover(self, inbox, outbox):
+        banks = [(bank_name, self.crawler.card_links(bank_url))
+                 for bank_name, bank_url in self.crawler.issuers()]
+        listed_all = True
+        for bank_name, links in banks:
+            try:
+                links = links.result()
+            except Exception as e:
+                LOGGER.error("Error: '%s'. Skipping issuer '%s'...", e, bank_name)
+                listed_all = False
+                continue
+            if self.manifest is not None:
+                self.manifest.seen([card_url for _, card_url in links], self._started)
+            for card_name, card_url in links:
+                if card_url in self.checkpoint:
+                    self.counts["skipped"] += 1
+                else:
+                    self._put(outbox, (card_name, card_url))
+        self._listed_all = listed_all
+
+
+    def _fetch(self, inbox, outbox):
+        # The bounded outbox caps how many pages are being fetched and parsed at once
+        for card_name, card_url in self._drain(inbox):
+            self._put(outbox, (card_name, card_url, self.crawler.fetch_card(card_url)))
+
+
+    def _extract(self, inbox, outbox):
+        for batch in self._batches(inbox):
+            items = []
+            for card_name, card_url, card in batch:
+                try:
+                    card_text = card.result().to_text()
+                except Exception as e:
+                    LOGGER.error("Error: '%s'. Failed crawling '%s'. Skipping...", e, card_name)
+                    self.counts["crawl_failed"] += 1
+                    continue
+                if self.manifest is not None:
+                    status = self.manifest.status(card_url, fingerprint(card_text))
+                    self.counts[status] += 1
+                    if status == "unchanged":
+                        continue
+                items.append(((card_name, card_url), card_text))
+            for extracted in self.extractor.extract(items):
+                self._put(outbox, extracted)
+
+        for extracted in self.extractor.drain():
+            self._put(outbox, extracted)
+
+
+    def _embed(self, inbox, outbox):
+        embeddings = get_embeddings()
+        for batch in self._batches(inbox):
+            records = [(card_url, text, metadata)
+                       for (_, card_url), card_summary, card_features in batch
+                       for text, metadata in chunk_records(card_summary, build_payload(card_features, card_url))]
+            fingerprints = {card_url: fingerprint(card_summary) for (_, card_url), card_summary, _ in batch}
+            with EMBED_SECONDS.time(operation="documents"):
+                vectors = embeddings.embed_documents([text for _, text, _ in records])
+            self._put(outbox, (records, vectors, fingerprints))
+
+
+    def _upsert(self, inbox, outbox):
+        for records, vectors, fingerprints in self._drain(inbox):
+            upsert_points(ids=[point_id(metadata) for _, _, metadata in records],
+                          vectors=vectors,
+                          texts=[text for _, text, _ in records],
+                          metadatas=[metadata for _, _, metadata in records])
+            cards = {card_url: metadata for card_url, _, metadata in records}
+            if self.merchant_index is not None:
+                for card_url, metadata in cards.items():
+                    self.merchant_index.add(card_url, metadata)
+                self.merchant_index.save()
+            card_urls = list(cards)
+            if self.snapshot is not None:
+                self._payloads.update(cards)
+            if self.manifest is not None:
+                self.manifest.record(fingerprints, self._started)
+            self.checkpoint.mark(card_urls)
+            self.counts["upserted"] += len(card_urls)
+            LOGGER.info("Indexed %d card(s) as %d record(s) to vectorDB (%d cards so far)...",
+                        len(card_urls), len(records), self.counts["upserted"])
+
+
+    def _remove_unlisted(self):
+        """Delete the points of cards no issuer lists any more"""
+        if not self._listed_all:
+            LOGGER.warning("Not every issuer could be listed; keeping cards that were not seen")
+            return
+        removed = self.manifest.stale(self._started)
+        if not removed:
+            return
+        self._removed = [card_id(card_url) for card_url in removed]
+        delete_cards(self._removed)
+        if self.merchant_index is not None:
+            for card_url in removed:
+                self.merchant_index.remove(card_url)
+            self.merchant_index.save()
+        self.manifest.remove(removed)
+        self.counts["removed"] = len(removed)
+        LOGGER.info("Removed %d card(s) that are no longer listed", len(removed))
+
+
+    def _update_snapshot(self):
+        payloads = self._payloads
+        if not self.snapshot.exists():
+            # Unchanged cards were not extracted this run; a new snapshot takes them from the index
+            payloads = {payload.get("card_url"): payload for payload in stored_payloads()}
+            payloads.update(self._payloads)
+            LOGGER.info("Building the catalog snapshot from %d indexed card(s)", len(payloads))
+        self.snapshot.update(payloads.values(), self._removed)
+
+
+    def run(self):
+        stages = [("discover", self._discover), ("fetch", self._fetch),
+                  ("extract", self._extract), ("embed", self._embed), ("upsert", self._upsert)]
+        queues = [None] + [queue.Queue(maxsize=self.queue_size) for _ in stages[1:]] + [None]
+        # Daemon threads let Ctrl+C end the run; the checkpoint makes it resumable
+        threads = [threading.Thread(target=self._run_stage, name=f"ingest-{name}",
+                                    args=(name, work, queues[i], queues[i + 1]), daemon=True)
+                   for i, (name, work) in enumerate(stages)]
+
+        self._started = time.time()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self.manifest is not None and not self._aborted.is_set():
+            self._remove_unlisted()
+        self.counts["points"] = flush_points()
+        if self.snapshot is not None:
+            self._update_snapshot()
+        elapsed = time.perf_counter() - start
+
+        self.counts["extract_failed"] = len(self.extractor.failed)
+        LOGGER.info("Ingest %s in %.1fs: %s",
+                    "aborted" if self._aborted.is_set() else "finished", elapsed, self.counts)
+
+        if self._aborted.is_set():
+            return False
+        self.checkpoint.reset()
+        return True
@@ -0,0 +1,73 @@
+import numpy as np
+
+from .config import (QUANTIZATION_OVERSAMPLING, QUANTIZATION_QUANTILE,
+                     QUANTIZATION_RESCORE, VECTOR_QUANTIZATION)
+
+MODES = ("none", "int8", "binary")
+
+# Set bits in every byte value, for Hamming distances over packed codes
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint16)
+
+
+def check_mode(mode):
+    if mode not in MODES:
+        raise ValueError(f"Unknown vector quantization {mode!r}, expected one of {', '.join(MODES)}")
+    return mode
+
+
+def fit(vectors, mode, quantile=QUANTIZATION_QUANTILE):
+    """Parameters for encoding ``vectors``: the int8 range covers ``quantile`` of all components"""
+    if mode != "int8" or not len(vectors):
+        return {}
+    tail = (1.0 - quantile) / 2
+    low, high = np.quantile(vectors, [tail, 1.0 - tail])
+    return {"offset": float(low), "step": float(max(high - low, 1e-12) / 255)}
+
+
+def encode(vectors, mode, params):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if mode == "binary":
+        return np.packbits(vectors > 0, axis=-1)
+    if mode == "int8":
+        # Stored unsigned: component ~= offset + code * step
+        codes = np.rint((vectors - params.get("offset", 0.0)) / params.get("step", 1.0))
+        return np.clip(codes, 0, 255).astype(np.uint8)
+    return vectors
+
+
+def approximate_scores(codes, query, mode, params):
+    """Scores of ``query`` against encoded vectors, ordered like their cosine similarities"""
+    if mode == "binary":
+        # Matching signs minus differing ones, so identical codes score highest
+        differing = POPCOUNT[np.bitwise_xor(codes, np.packbits(query > 0))].sum(axis=-1, dtype=np.int32)
+        return (len(query) - 2 * differing).astype(np.float32)
+    if mode == "int8":
+        return params["offset"] * query.sum() + params["step"] * (codes @ query)
+    return codes @ query
+
+
+def shortlist_size(k, oversampling=QUANTIZATION_OVERSAMPLING):
+    return max(k, int(np.ceil(k * oversampling)))
+
+
+def qdrant_quantization_config(mode=VECTOR_QUANTIZATION, quantile=QUANTIZATION_QUANTILE):
+    from qdrant_client import models
+
+    if check_mode(mode) == "int8":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8, quantile=quantile, always_ram=True))
+    if mode == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def qdrant_search_params(mode=VECTOR_QUANTIZATION,
+                         oversampling=QUANTIZATION_OVERSAMPLING,
+                         rescore=QUANTIZATION_RESCORE):
+    """Search on the quantized vectors, then rescore the oversampled shortlist with the originals"""
+    from qdrant_client import models
+
+    if check_mode(mode) == "none":
+        return None
+    return models.SearchParams(quantization=models.QuantizationSearchParams(
+        rescore=rescore, oversampling=oversampling))
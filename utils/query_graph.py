@@ -1,65 +1,207 @@
 from typing import List, TypedDict
 
+import numpy as np
+
 from langchain_core.documents import Document
 from langgraph.graph import END, START, StateGraph
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
 
-from .card_filters import CardFilters, QUERY_PARSER_CHAIN
+from .card_filters import CardFilters, get_query_parser_chain
+from .card_filters import rate_limiter as query_parser_rate_limiter
+from .card_payload import (RANGE_FILTER_KEYS, normalize_category,
+                           normalize_merchant)
+from .chunking import GROUP_KEY
+from .config import (COLLECTION_NAME, INDEX_MODE, MERCHANT_RERANK_CANDIDATES,
+                     VECTOR_BACKEND)
+from .fast_query_parser import FastQueryParser
+from .intent_cache import IntentCache
 from .logging_config import LOGGER
+from .merchant_index import MerchantIndex
+from .metrics import EMBED_SECONDS, VECTOR_SEARCH_SECONDS, timed_node
+from .quantization import qdrant_search_params
+from .resources import (get_embeddings, get_qdrant_client, get_vector_store,
+                        lazy_singleton, stored_payloads)
+
+
+def _build_merchant_index():
+    """Load the ingest-time merchant index, rebuilding it from the vector store if missing"""
+    merchant_index = MerchantIndex()
+    if len(merchant_index):
+        return merchant_index
+
+    for metadata in stored_payloads(["card_url", "merchant_offers"]):
+        merchant_index.add(metadata.get("card_url"), metadata)
 
+    if len(merchant_index):
+        merchant_index.save()
+    return merchant_index
 
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-client = QdrantClient(url="http://localhost:6333")
 
-vector_store = QdrantVectorStore(
-    client=client,
-    collection_name="credit_cards",
-    embedding=embeddings,
-)
+get_merchant_index = lazy_singleton(_build_merchant_index)
+INTENT_CACHE = IntentCache(embed=lambda text: get_embeddings().embed_query(text))
+FAST_QUERY_PARSER = FastQueryParser(merchant_loader=lambda: get_merchant_index().spellings())
+
+
+class LLMBudgetExhausted(RuntimeError):
+    pass
 
 
 class GraphState(TypedDict):
     user_input: str
+    wait_for_llm: bool
     query_intent: CardFilters | None
     context: List[Document]
 
 
 def _metadata_filter(query_intent):
-    metadata_filter = {"must": [], "should": []}
-    filter_keys = {"acceptable_fees": "renewal_fee"}
-
-    for key in query_intent.keys():
-        if key.startswith("has"):
-            filter_key = f"metadata.{key}"
-            metadata_filter["should"].append({"key": filter_key, "match": {"value": True}})
-        else:
-            filter_key = f"metadata.{filter_keys[key]}"
-            value = query_intent["acceptable_fees"]
-            metadata_filter["must"].append({"key": "filter_key", "range": {"lte": value}})
-
+    must, should = [], []
+
+    for key, value in query_intent.items():
+        if key.startswith("has") and value:
+            should.append({"key": f"metadata.{key}", "match": {"value": True}})
+        elif key in RANGE_FILTER_KEYS and value is not None:
+            filter_key = f"metadata.{RANGE_FILTER_KEYS[key]}"
+            must.append({"key": filter_key, "range": {"lte": value}})
+
+    categories = [normalize_category(c) for c in query_intent.get("top_spend_categories") or []]
+    if categories:
+        should.append({"key": "metadata.categories", "match": {"any": categories}})
+
+    merchants = [normalize_merchant(m) for m in query_intent.get("top_merchant_brands") or []]
+    if merchants:
+        should.append({"key": "metadata.merchant_brands", "match": {"any": merchants}})
+
+    # An empty should clause matches no point in Qdrant, so clauses are only set when used
+    metadata_filter = {}
+    if must:
+        metadata_filter["must"] = must
+    if should:
+        metadata_filter["should"] = should
     return metadata_filter
 
 
+def parse_query_intent(user_input, wait_for_llm=True):
+    """Resolve intent from the cache, the rule-based parser or the LLM, in that order.
+
+    With ``wait_for_llm=False`` a query that needs the LLM while its rate
+    limiter is out of tokens raises ``LLMBudgetExhausted`` instead of queueing.
+    """
+    query_intent = INTENT_CACHE.get(user_input)
+
+    if query_intent is None:
+        query_intent = FAST_QUERY_PARSER.try_parse(user_input)
+
+    if query_intent is None:
+        token = None
+        if not wait_for_llm:
+            token = query_parser_rate_limiter.try_acquire()
+            if token is None:
+                raise LLMBudgetExhausted("Query parser LLM budget exhausted")
+        LOGGER.info("Parsing User Query to extract intent...")
+        with query_parser_rate_limiter.prepaid(token):
+            query_intent = get_query_parser_chain().invoke({"user_input": user_input})
+        if query_intent is not None:
+            INTENT_CACHE.put(user_input, query_intent)
+
+    return query_intent
+
+
+def _document_from_point(point):
+    payload = point.payload or {}
+    metadata = dict(payload.get("metadata") or {})
+    metadata["_id"] = point.id
+    metadata["_collection_name"] = COLLECTION_NAME
+    return Document(page_content=payload.get("page_content", ""), metadata=metadata)
+
+
+def _candidates(query_intent, k):
+    """How many hits to fetch so merchant re-scoring has room to promote cards"""
+    return max(k, MERCHANT_RERANK_CANDIDATES) if query_intent.top_merchant_brands else k
+
+
+def _scored_search(vectors, query_intents, k=10):
+    """``(Document, score)`` candidates for each query vector and its intent"""
+    limits = [_candidates(query_intent, k) for query_intent in query_intents]
+    group_by = f"metadata.{GROUP_KEY}" if INDEX_MODE == "chunk" else None
+    if VECTOR_BACKEND == "local":
+        filters = [_metadata_filter(query_intent.model_dump()) for query_intent in query_intents]
+        with VECTOR_SEARCH_SECONDS.time(backend=VECTOR_BACKEND, operation="batch"):
+            return get_vector_store().search_by_vectors(vectors, filters, k=max(limits), group_by=group_by)
+
+    from qdrant_client import models
+
+    search_params = qdrant_search_params()
+    if group_by:
+        # One grouped query per vector: Qdrant has no batched group-by search
+        results = []
+        for vector, query_intent, limit in zip(vectors, query_intents, limits):
+            with VECTOR_SEARCH_SECONDS.time(backend=VECTOR_BACKEND, operation="grouped"):
+                response = get_qdrant_client().query_points_groups(
+                    collection_name=COLLECTION_NAME,
+                    query=vector,
+                    group_by=group_by,
+                    query_filter=models.Filter(**_metadata_filter(query_intent.model_dump())),
+                    limit=limit,
+                    group_size=1,
+                    search_params=search_params,
+                    with_payload=True,
+                )
+            results.append([(_document_from_point(group.hits[0]), group.hits[0].score)
+                            for group in response.groups])
+        return results
+
+    requests = [
+        models.QueryRequest(query=vector,
+                            filter=models.Filter(**_metadata_filter(query_intent.model_dump())),
+                            limit=limit,
+                            params=search_params,
+                            with_payload=True)
+        for vector, query_intent, limit in zip(vectors, query_intents, limits)
+    ]
+    with VECTOR_SEARCH_SECONDS.time(backend=VECTOR_BACKEND, operation="batch"):
+        responses = get_qdrant_client().query_batch_points(collection_name=COLLECTION_NAME,
+                                                           requests=requests)
+    return [[(_document_from_point(point), point.score) for point in response.points]
+            for response in responses]
+
+
+def _rank(scored, query_intent, k=10):
+    """Top ``k`` documents once cards with offers from the user's merchants are boosted"""
+    merchants = query_intent.top_merchant_brands or []
+    if not merchants or not scored:
+        return [doc for doc, _ in scored[:k]]
+
+    docs, scores = zip(*scored)
+    scores = get_merchant_index().rescore([doc.metadata.get("card_url") for doc in docs],
+                                          scores, merchants)
+    return [docs[i] for i in np.argsort(-scores, kind="stable")[:k]]
+
+
+def search_many(queries, query_intents, k=10):
+    """Embed ``queries`` in one call and run their filtered searches as one batch"""
+    with EMBED_SECONDS.time(operation="queries"):
+        vectors = get_embeddings().embed_documents(queries)
+    results = _scored_search(vectors, query_intents, k=k)
+    return [_rank(scored, query_intent, k) for scored, query_intent in zip(results, query_intents)]
+
+
+@timed_node("query")
 def extract_query_intent_node(state: GraphState) -> GraphState:
     """Use the query parser chain to extract intent from the user input"""
-    LOGGER.info("Parsing User Query to extract intent...")
-    query_intent = QUERY_PARSER_CHAIN.invoke({"user_input": state["user_input"]})
-    state["query_intent"] = query_intent
+    state["query_intent"] = parse_query_intent(state["user_input"],
+                                               wait_for_llm=state.get("wait_for_llm", True))
     return state
 
 
+@timed_node("query")
 def retrieve_documents_node(state: GraphState) -> GraphState:
     """Generate Metadata filters using extracted query intent"""
     LOGGER.info("Generating metadata filters...")
     query = state["user_input"]
     query_intent = state["query_intent"]
-    metadata_filter = _metadata_filter(query_intent.model_dump())
-    results = vector_store.similarity_search(query=query,
-                                             k=10,
-                                             filter=metadata_filter)
-    state["context"] = results
+    with EMBED_SECONDS.time(operation="query"):
+        vector = get_embeddings().embed_query(query)
+    scored = _scored_search([vector], [query_intent], k=10)[0]
+    state["context"] = _rank(scored, query_intent, k=10)
     return state
 
 
@@ -0,0 +1,191 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from uuid import uuid4
+
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from .config import (LLM_CHECK_EVERY_SECONDS, LLM_INTERACTIVE_RESERVE,
+                     LLM_MAX_BUCKET_SIZE, LLM_RATE_LIMIT_PATH,
+                     LLM_REQUESTS_PER_SECOND)
+from .metrics import RATE_LIMIT_WAIT_SECONDS
+
+INTERACTIVE = 0
+BULK = 1
+
+# A waiter that has not polled for this long is assumed to be gone
+STALE_WAITER_SECONDS = 5.0
+
+# The prepaid token spendable by the current thread or asyncio task
+_PREPAID = ContextVar("prepaid_rate_limit_token", default=None)
+
+
+class PrepaidToken:
+    """A request ``try_acquire`` already took a token for"""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.spent = False
+
+
+class SharedRateLimiter(BaseRateLimiter):
+    """Token bucket kept in SQLite so every process calling the LLM shares it.
+
+    Each acquire runs as one ``BEGIN IMMEDIATE`` transaction that refills the
+    bucket for the time elapsed and takes a token. Interactive callers
+    register while they wait, and bulk callers back off while any are
+    registered; bulk callers also leave ``reserve`` tokens in the bucket so
+    an interactive call arriving later does not have to wait a full refill.
+
+    ``try_acquire`` checks the budget without blocking and returns the token
+    it took; inside ``prepaid(token)`` it pays for the model's next
+    ``acquire`` or ``aacquire`` instead of a fresh one.
+    """
+
+    def __init__(self, name, priority=BULK,
+                 bucket="gemini",
+                 path=LLM_RATE_LIMIT_PATH,
+                 requests_per_second=LLM_REQUESTS_PER_SECOND,
+                 max_bucket_size=LLM_MAX_BUCKET_SIZE,
+                 check_every_n_seconds=LLM_CHECK_EVERY_SECONDS,
+                 reserve=LLM_INTERACTIVE_RESERVE,
+                 clock=time.time):
+        self.name = name
+        self.priority = priority
+        self.bucket = bucket
+        self.path = path
+        self.requests_per_second = requests_per_second
+        self.max_bucket_size = max_bucket_size
+        self.check_every_n_seconds = check_every_n_seconds
+        # Never reserve the whole bucket, or bulk callers would starve
+        self.reserve = min(reserve, max_bucket_size - 1) if priority == BULK else 0
+        # Wall-clock time, since the bucket's timestamps are shared across processes
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = None
+
+
+    def _connect(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS waiters (
+                    id TEXT PRIMARY KEY,
+                    bucket TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    seen REAL NOT NULL
+                );
+            """)
+        return self._conn
+
+
+    def _consume(self, waiter=None):
+        """One attempt at taking a token; registers ``waiter`` as waiting if it fails"""
+        with self._lock:
+            conn = self._connect()
+            now = self.clock()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?",
+                                   (self.bucket,)).fetchone()
+                if row is None:
+                    # Start empty, like InMemoryRateLimiter, to avoid a burst
+                    tokens, updated = 0.0, now
+                else:
+                    tokens, updated = row
+                tokens = min(self.max_bucket_size,
+                             tokens + max(0.0, now - updated) * self.requests_per_second)
+
+                conn.execute("DELETE FROM waiters WHERE seen < ?", (now - STALE_WAITER_SECONDS,))
+                yielding = self.priority == BULK and conn.execute(
+                    "SELECT 1 FROM waiters WHERE bucket = ? AND priority < ? LIMIT 1",
+                    (self.bucket, self.priority)).fetchone() is not None
+
+                acquired = not yielding and tokens >= 1 + self.reserve
+                if acquired:
+                    tokens -= 1
+                conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (self.bucket, tokens, now))
+                if acquired or waiter is None:
+                    conn.execute("DELETE FROM waiters WHERE id = ?", (waiter,))
+                else:
+                    conn.execute("INSERT OR REPLACE INTO waiters VALUES (?, ?, ?, ?)",
+                                 (waiter, self.bucket, self.priority, now))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return acquired
+
+
+    def _release_waiter(self, waiter):
+        with self._lock:
+            self._connect().execute("DELETE FROM waiters WHERE id = ?", (waiter,))
+
+
+    def try_acquire(self):
+        """A ``PrepaidToken`` if the budget allows a call right now, else None"""
+        return PrepaidToken(self) if self._consume() else None
+
+
+    @contextmanager
+    def prepaid(self, token):
+        """Let the first acquire inside the block spend ``token``"""
+        reset = _PREPAID.set(token)
+        try:
+            yield
+        finally:
+            _PREPAID.reset(reset)
+
+
+    def _spend_prepaid(self):
+        token = _PREPAID.get()
+        if token is not None and token.limiter is self and not token.spent:
+            token.spent = True
+            return True
+        return False
+
+
+    def acquire(self, *, blocking=True):
+        if self._spend_prepaid():
+            return True
+        if not blocking:
+            return self._consume()
+
+        waiter = f"{os.getpid()}-{uuid4().hex}"
+        with RATE_LIMIT_WAIT_SECONDS.time(limiter=self.name):
+            try:
+                while not self._consume(waiter):
+                    time.sleep(self.check_every_n_seconds)
+            finally:
+                self._release_waiter(waiter)
+        return True
+
+
+    async def aacquire(self, *, blocking=True):
+        # The SQLite transaction blocks (up to its busy timeout), so it runs off the event loop
+        if self._spend_prepaid():
+            return True
+        if not blocking:
+            return await asyncio.to_thread(self._consume)
+
+        waiter = f"{os.getpid()}-{uuid4().hex}"
+        with RATE_LIMIT_WAIT_SECONDS.time(limiter=self.name):
+            try:
+                while not await asyncio.to_thread(self._consume, waiter):
+                    await asyncio.sleep(self.check_every_n_seconds)
+            finally:
+                await asyncio.to_thread(self._release_waiter, waiter)
+        return True
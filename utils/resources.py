@@ -0,0 +1,237 @@
+import os
+import threading
+
+from functools import wraps
+from uuid import UUID
+
+from .config import (COLLECTION_NAME, EMBEDDING_BACKEND, EMBEDDING_BATCH_SIZE,
+                     EMBEDDING_CACHE_DIR, EMBEDDING_MODEL, EMBEDDING_ONNX_FILE,
+                     EMBEDDING_SIZE, EMBEDDING_THREADS, LOCAL_INDEX_DIR,
+                     QDRANT_URL, UPSERT_BATCH_SIZE, UPSERT_PARALLEL,
+                     VECTOR_BACKEND, VECTOR_QUANTIZATION)
+from .logging_config import LOGGER
+
+
+def lazy_singleton(factory):
+    """Build the factory's result on first call and share it across threads"""
+    lock = threading.Lock()
+    instance = []
+
+    @wraps(factory)
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    def reset():
+        with lock:
+            instance.clear()
+
+    def override(value):
+        """Serve ``value`` instead of building one, e.g. a fake in benchmarks"""
+        with lock:
+            instance[:] = [value]
+
+    get.reset = reset
+    get.override = override
+    return get
+
+
+def _embedding_model():
+    """The configured embedding backend and the name its vectors are cached under"""
+    if EMBEDDING_BACKEND == "onnx":
+        from .onnx_embeddings import OnnxEmbeddings
+
+        variant = os.path.splitext(os.path.basename(EMBEDDING_ONNX_FILE))[0]
+        return OnnxEmbeddings(), f"{EMBEDDING_MODEL}-onnx-{variant}"
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    if EMBEDDING_THREADS:
+        import torch
+        torch.set_num_threads(EMBEDDING_THREADS)
+    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL,
+                                       encode_kwargs={"batch_size": EMBEDDING_BATCH_SIZE})
+    return embeddings, EMBEDDING_MODEL
+
+
+@lazy_singleton
+def get_embeddings():
+    embeddings, model_name = _embedding_model()
+    if not EMBEDDING_CACHE_DIR:
+        return embeddings
+
+    from .embedding_cache import CachedEmbeddings
+    return CachedEmbeddings(embeddings, model_name)
+
+
+@lazy_singleton
+def get_qdrant_client():
+    from qdrant_client import QdrantClient
+    return QdrantClient(url=QDRANT_URL)
+
+
+def ensure_collection():
+    if VECTOR_BACKEND == "local":
+        return
+
+    from qdrant_client.http.models import (Disabled, Distance, PayloadSchemaType,
+                                           VectorParams)
+
+    from .card_payload import PAYLOAD_INDEXES
+    from .quantization import qdrant_quantization_config
+
+    client = get_qdrant_client()
+    quantization_config = qdrant_quantization_config()
+    LOGGER.info("Checking if collection exists..")
+    if client.collection_exists(collection_name=COLLECTION_NAME):
+        LOGGER.info("Collection already exists.")
+        current = client.get_collection(collection_name=COLLECTION_NAME).config.quantization_config
+        if current != quantization_config:
+            LOGGER.info("Updating collection quantization to '%s'...", VECTOR_QUANTIZATION)
+            # None would leave the current quantization in place; turning it off takes an explicit Disabled
+            client.update_collection(collection_name=COLLECTION_NAME,
+                                     quantization_config=quantization_config or Disabled.DISABLED)
+
+    else:
+        LOGGER.info("Collection does not exist. Creating collection...")
+        client.create_collection(
+            collection_name=COLLECTION_NAME,
+            vectors_config=VectorParams(size=EMBEDDING_SIZE, distance=Distance.COSINE),
+            quantization_config=quantization_config,
+        )
+
+    indexed = client.get_collection(collection_name=COLLECTION_NAME).payload_schema
+    for field_name, field_schema in PAYLOAD_INDEXES.items():
+        if field_name not in indexed:
+            LOGGER.info("Creating payload index on '%s'...", field_name)
+            client.create_payload_index(collection_name=COLLECTION_NAME,
+                                        field_name=field_name,
+                                        field_schema=PayloadSchemaType(field_schema),
+                                        wait=True)
+
+
+@lazy_singleton
+def get_vector_store():
+    if VECTOR_BACKEND == "local":
+        from .local_store import LocalVectorStore
+        return LocalVectorStore(get_embeddings(), LOCAL_INDEX_DIR)
+
+    from langchain_qdrant import QdrantVectorStore
+    return QdrantVectorStore(
+        client=get_qdrant_client(),
+        collection_name=COLLECTION_NAME,
+        embedding=get_embeddings(),
+    )
+
+
+def warmup(llm=True):
+    """Construct the lazily built models and clients ahead of the first request"""
+    LOGGER.info("Warming up embeddings and vector store...")
+    get_embeddings().embed_query("warmup")
+    get_vector_store()
+
+    if llm:
+        from .card_features import get_feature_extractor_chain
+        from .card_filters import get_query_parser_chain
+
+        LOGGER.info("Warming up LLM chains...")
+        get_feature_extractor_chain()
+        get_query_parser_chain()
+
+
+def upsert_points(ids, vectors, texts, metadatas, wait=False):
+    """Write pre-embedded documents to the configured vector store.
+
+    The points replace everything indexed for their cards: other points with
+    the same ``card_id`` (e.g. chunks a shorter summary no longer has) are
+    deleted. Qdrant writes are uploaded in ``UPSERT_BATCH_SIZE`` batches
+    without waiting for them to be applied unless ``wait`` is set; call
+    ``flush_points`` once a run is done.
+    """
+    from .chunking import GROUP_KEY
+
+    card_ids = sorted({metadata[GROUP_KEY] for metadata in metadatas if metadata.get(GROUP_KEY)})
+    if VECTOR_BACKEND == "local":
+        store = get_vector_store()
+        store.upsert_vectors(ids, vectors, texts, metadatas)
+        keep, replaced = set(ids), set(card_ids)
+        stale = [id_ for id_, card in zip(store.ids, store.payload_column(GROUP_KEY))
+                 if card in replaced and id_ not in keep]
+        if stale:
+            store.delete(stale)
+        return
+
+    from qdrant_client.http import models
+
+    client = get_qdrant_client()
+    points = [models.PointStruct(id=id_, vector=list(vector), payload={"page_content": text, "metadata": metadata})
+              for id_, vector, text, metadata in zip(ids, vectors, texts, metadatas)]
+    client.upload_points(collection_name=COLLECTION_NAME, points=points,
+                         batch_size=UPSERT_BATCH_SIZE,
+                         parallel=UPSERT_PARALLEL if len(points) > UPSERT_BATCH_SIZE else 1,
+                         wait=wait)
+    if card_ids:
+        client.delete(collection_name=COLLECTION_NAME, wait=wait,
+                      points_selector=models.FilterSelector(filter=models.Filter(
+                          must=[models.FieldCondition(key=f"metadata.{GROUP_KEY}",
+                                                      match=models.MatchAny(any=card_ids))],
+                          must_not=[models.HasIdCondition(has_id=list(ids))])))
+
+
+def delete_cards(card_ids, wait=False):
+    """Delete every point indexed for the given cards"""
+    from .chunking import GROUP_KEY
+
+    card_ids = sorted(set(card_ids))
+    if not card_ids:
+        return
+    if VECTOR_BACKEND == "local":
+        store = get_vector_store()
+        removed = set(card_ids)
+        store.delete([id_ for id_, card in zip(store.ids, store.payload_column(GROUP_KEY)) if card in removed])
+        return
+
+    from qdrant_client.http import models
+
+    get_qdrant_client().delete(collection_name=COLLECTION_NAME, wait=wait,
+                               points_selector=models.FilterSelector(filter=models.Filter(
+                                   must=[models.FieldCondition(key=f"metadata.{GROUP_KEY}",
+                                                               match=models.MatchAny(any=card_ids))])))
+
+
+def stored_payloads(fields=None):
+    """Yield the metadata of every indexed point, only its ``fields`` if given"""
+    if VECTOR_BACKEND == "local":
+        for metadata in get_vector_store().payloads():
+            yield metadata if fields is None else {field: metadata.get(field) for field in fields}
+        return
+
+    offset = None
+    while True:
+        points, offset = get_qdrant_client().scroll(collection_name=COLLECTION_NAME,
+                                                    with_payload=[f"metadata.{field}" for field in fields]
+                                                    if fields is not None else ["metadata"],
+                                                    limit=256,
+                                                    offset=offset)
+        for point in points:
+            yield point.payload.get("metadata", {})
+        if offset is None:
+            break
+
+
+def flush_points():
+    """Wait until every write sent so far is applied and return the number of points"""
+    if VECTOR_BACKEND == "local":
+        return len(get_vector_store())
+
+    from qdrant_client.http import models
+
+    client = get_qdrant_client()
+    # Updates are applied in order, so a no-op that waits covers all earlier ones
+    client.delete(collection_name=COLLECTION_NAME, wait=True,
+                  points_selector=models.FilterSelector(filter=models.Filter(
+                      must=[models.HasIdCondition(has_id=[str(UUID(int=0))])])))
+    return client.count(collection_name=COLLECTION_NAME, exact=True).count
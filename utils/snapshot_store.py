@@ -0,0 +1,229 @@
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from .config import SNAPSHOT_DIR
+from .logging_config import LOGGER
+
+try:
+    import zstandard
+    CODEC = "zst"
+except ImportError:
+    CODEC = "gz"
+
+INDEX_FILE = "index.sqlite"
+OBJECTS_DIR = "objects"
+
+
+class SnapshotMissing(KeyError):
+    pass
+
+
+def _compress(data, codec):
+    if codec == "zst":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _decompress(data, codec):
+    if codec == "zst":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class SnapshotStore:
+    """Compressed, content-addressed archive of fetched pages.
+
+    Page bodies are stored once per SHA-256 digest under ``objects/``; a SQLite
+    index maps each URL to its current digest and the ``ETag`` /
+    ``Last-Modified`` validators the server sent, which the crawler replays as
+    conditional request headers. Parse results are cached by digest too, so a
+    page that has not changed is never parsed twice.
+
+    ``prune`` at the end of a crawl deletes objects no URL points at any more
+    and parse results the crawl did not use, so the archive only holds what
+    the current catalog needs.
+    """
+
+    def __init__(self, path=SNAPSHOT_DIR, codec=CODEC):
+        self.path = path
+        self.codec = codec
+        self.counts = {"stored": 0, "not_modified": 0, "replayed": 0, "parse_hits": 0}
+        self._lock = threading.Lock()
+        self._used_parsed = set()
+
+        os.makedirs(os.path.join(path, OBJECTS_DIR), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(path, INDEX_FILE), check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                codec TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                checked_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS parsed (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+
+    def __contains__(self, url):
+        return self._page(url) is not None
+
+
+    def _page(self, url):
+        with self._lock:
+            return self._conn.execute("SELECT digest, codec, etag, last_modified FROM pages WHERE url = ?",
+                                      (url,)).fetchone()
+
+
+    def _object_path(self, digest, codec):
+        return os.path.join(self.path, OBJECTS_DIR, digest[:2], f"{digest}.{codec}")
+
+
+    def validators(self, url):
+        """Conditional request headers for revalidating ``url``"""
+        page = self._page(url)
+        if page is None:
+            return {}
+        _, _, etag, last_modified = page
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+
+    def read(self, url, not_modified=False):
+        """``(digest, content)`` of the archived copy of ``url``"""
+        page = self._page(url)
+        if page is None:
+            raise SnapshotMissing(url)
+        digest, codec, _, _ = page
+        with open(self._object_path(digest, codec), "rb") as f:
+            content = _decompress(f.read(), codec)
+
+        now = time.time()
+        with self._lock:
+            if not_modified:
+                self.counts["not_modified"] += 1
+                self._conn.execute("UPDATE pages SET checked_at = ? WHERE url = ?", (now, url))
+                self._conn.commit()
+            else:
+                self.counts["replayed"] += 1
+        return digest, content
+
+
+    def put(self, url, content, etag=None, last_modified=None):
+        """Archive a freshly downloaded body of ``url`` and return its digest"""
+        digest = hashlib.sha256(content).hexdigest()
+        object_path = self._object_path(digest, self.codec)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            tmp_path = f"{object_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_compress(content, self.codec))
+            os.replace(tmp_path, object_path)
+
+        now = time.time()
+        with self._lock:
+            self.counts["stored"] += 1
+            self._conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (url, digest, self.codec, etag, last_modified, now, now))
+            self._conn.commit()
+        return digest
+
+
+    @staticmethod
+    def parsed_key(version, parser, digest, args):
+        return hashlib.sha256(f"{version}\0{parser}\0{digest}\0{args!r}".encode()).hexdigest()
+
+
+    def get_parsed(self, key):
+        with self._lock:
+            self._used_parsed.add(key)
+            row = self._conn.execute("SELECT value FROM parsed WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.counts["parse_hits"] += 1
+        return pickle.loads(row[0])
+
+
+    def put_parsed(self, key, value):
+        with self._lock:
+            self._used_parsed.add(key)
+            self._conn.execute("INSERT OR REPLACE INTO parsed VALUES (?, ?)",
+                               (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)))
+            self._conn.commit()
+
+
+    def clear_parsed(self):
+        """Drop cached parse results but keep the archived pages"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM parsed")
+            self._conn.commit()
+        if cursor.rowcount:
+            LOGGER.info("Cleared %d cached parse result(s).", cursor.rowcount)
+        return cursor.rowcount
+
+
+    def prune(self):
+        """Delete objects no URL points at and parse results not used since the store was opened"""
+        with self._lock:
+            live = set(self._conn.execute("SELECT DISTINCT digest, codec FROM pages"))
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS used_parsed (key TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM used_parsed")
+            self._conn.executemany("INSERT INTO used_parsed VALUES (?)", [(key,) for key in self._used_parsed])
+            parsed = self._conn.execute("DELETE FROM parsed WHERE key NOT IN (SELECT key FROM used_parsed)").rowcount
+            self._conn.commit()
+
+            objects, freed = 0, 0
+            for shard in os.scandir(os.path.join(self.path, OBJECTS_DIR)):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    digest, _, codec = entry.name.partition(".")
+                    # Skip objects still being written by put
+                    if entry.name.endswith(".tmp") or (digest, codec) in live:
+                        continue
+                    freed += entry.stat().st_size
+                    os.remove(entry.path)
+                    objects += 1
+        LOGGER.info("Pruned %d unreferenced object(s) (%d bytes) and %d unused parse result(s).",
+                    objects, freed, parsed)
+        return {"objects": objects, "bytes": freed, "parsed": parsed}
+
+
+    def stats(self):
+        with self._lock:
+            pages, objects = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT digest) FROM pages").fetchone()
+        archived = sum(entry.stat().st_size
+                       for shard in os.scandir(os.path.join(self.path, OBJECTS_DIR)) if shard.is_dir()
+                       for entry in os.scandir(shard.path))
+        return {"pages": pages, "objects": objects, "archived_bytes": archived, **self.counts}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect the raw page snapshot archive")
+    parser.add_argument("--path", default=SNAPSHOT_DIR)
+    parser.add_argument("--clear-parsed", action="store_true",
+                        help="Drop cached parse results but keep the pages")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.path)
+    if args.clear_parsed:
+        store.clear_parsed()
+    print(json.dumps(store.stats(), indent=2))
@@ -1,3 +1,8 @@
+import re
+
+from .config import CARD_FIELD_TOKEN_BUDGET, CARD_TOKEN_BUDGET
+from .metrics import CARD_TEXT_TOKENS
+
 KEYS = ['Product Name', 
         'Product Description', 
         'Product Details', 
@@ -25,7 +30,7 @@ ITERABLE_KEYS = ['Product Details',
 def json_to_text(json_):
     text = ""
     for key in KEYS:
-        value = json_[key] if json_[key] else ""
+        value = json_.get(key) or ""
         if key in ITERABLE_KEYS:
             text += f"** {key}: **"
             for element in value:
@@ -34,4 +39,136 @@ def json_to_text(json_):
         else:
             text += f"** {key}: ** {value}\n"
     
-    return text
\ No newline at end of file
+    return text
+
+
+TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+WHITESPACE = re.compile(r"\s+")
+ELLIPSIS = "\u2026"
+# Shorter values are kept even when repeated: "Rs. 500" as both fees is two facts
+DUPLICATE_MIN_TOKENS = 5
+# Cut, in this order, when a card is over the total budget; the fields
+# CardFeatures is extracted from are short and stay whole
+TRIM_ORDER = ['Interest Rates',
+              'Fuel Surcharge',
+              'Product Description',
+              'Product Details']
+# Bullets naming an offer or a merchant ("5% cashback on Amazon", "10X points at
+# Swiggy") feed CardFeatures.merchant_offers, so trimming never cuts them
+OFFER_PATTERN = re.compile(r"%|\b(?:offers?|cash ?back|discounts?|off|save|savings|rewards?|points?"
+                           r"|vouchers?|coupons?|complimentary|free|membership|\d+\s*x)\b"
+                           r"|\b(?:on|at|with|from) (?-i:[A-Z])[\w&'.-]+", re.IGNORECASE)
+
+
+def count_tokens(text):
+    """Estimated LLM tokens: words in pieces of up to four characters, plus punctuation"""
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def _truncate(text, budget):
+    for i, match in enumerate(TOKEN_PATTERN.finditer(text)):
+        if i == budget:
+            return text[:match.start()].rstrip() + ELLIPSIS
+    return text
+
+
+def _trim(items, budget, keep=()):
+    """The leading ``items`` that fit ``budget`` tokens, the last one cut
+    short; items in ``keep`` stay whole and count against the budget first"""
+    budget -= sum(count_tokens(item) for item in items if item in keep)
+    kept, full = [], False
+    for item in items:
+        if item in keep:
+            kept.append(item)
+            continue
+        if full:
+            continue
+        tokens = count_tokens(item)
+        if tokens > budget:
+            if budget > 0:
+                kept.append(_truncate(item, budget))
+            full = True
+            continue
+        kept.append(item)
+        budget -= tokens
+    return kept
+
+
+def _offers(key, items):
+    return {item for item in items if OFFER_PATTERN.search(item)} if key == 'Product Details' else set()
+
+
+def _clean(value, iterable):
+    """Whitespace-collapsed, non-empty items of a field, without repeats"""
+    items = {}
+    for item in (value or []) if iterable else [value]:
+        item = WHITESPACE.sub(" ", str(item)).strip() if item is not None else ""
+        if item:
+            items.setdefault(item.casefold(), item)
+    return list(items.values())
+
+
+def _render(fields):
+    lines = []
+    for key, items in fields.items():
+        if key in ITERABLE_KEYS:
+            lines.append(f"{key}:")
+            lines.extend(f"- {item}" for item in items)
+        else:
+            lines.append(f"{key}: {items[0]}")
+    return "\n".join(lines)
+
+
+def compact_fields(json_, field_budget=CARD_FIELD_TOKEN_BUDGET, total_budget=CARD_TOKEN_BUDGET):
+    """``(text, report)``: the ``KEYS`` of ``json_`` as ``key: value`` lines
+    and ``- item`` bullets, without empty values, whitespace collapsed and
+    each field cut to ``field_budget`` tokens. Values repeated from another
+    field are dropped from the ``TRIM_ORDER`` fields, and over
+    ``total_budget`` those fields are cut further, except for the 'Product
+    Details' bullets matching ``OFFER_PATTERN``. ``report`` has the
+    estimated tokens of ``json_to_text`` and of the compact text, and the
+    fields that were cut.
+    """
+    values = {key: _clean(json_.get(key), key in ITERABLE_KEYS) for key in KEYS}
+    # Repeats are only ever dropped from the TRIM_ORDER fields, so a value also
+    # in a field CardFeatures is extracted from keeps that copy
+    seen = {item.casefold() for key, items in values.items() if key not in TRIM_ORDER
+            for item in items if count_tokens(item) >= DUPLICATE_MIN_TOKENS}
+    fields, truncated = {}, []
+    for key, items in values.items():
+        if key in TRIM_ORDER:
+            items = [item for item in items if item.casefold() not in seen]
+            seen.update(item.casefold() for item in items if count_tokens(item) >= DUPLICATE_MIN_TOKENS)
+        if not items:
+            continue
+        fields[key] = _trim(items, field_budget, _offers(key, items))
+        if fields[key] != items:
+            truncated.append(key)
+
+    text = _render(fields)
+    for key in TRIM_ORDER:
+        excess = count_tokens(text) - total_budget
+        if excess <= 0:
+            break
+        if key not in fields:
+            continue
+        items = _trim(fields[key], sum(map(count_tokens, fields[key])) - excess, _offers(key, fields[key]))
+        if items:
+            fields[key] = items
+        else:
+            del fields[key]
+        if key not in truncated:
+            truncated.append(key)
+        text = _render(fields)
+
+    report = {"tokens_before": count_tokens(json_to_text(json_)),
+              "tokens_after": count_tokens(text),
+              "truncated": truncated}
+    return text, report
+
+
+def json_to_compact_text(json_, field_budget=CARD_FIELD_TOKEN_BUDGET, total_budget=CARD_TOKEN_BUDGET):
+    text, report = compact_fields(json_, field_budget, total_budget)
+    CARD_TEXT_TOKENS.inc(report["tokens_before"], form="full")
+    CARD_TEXT_TOKENS.inc(report["tokens_after"], form="compact")
+    return text